@@ -0,0 +1,65 @@
+"""
+Проверка планов запросов справки на локальной БД с данными (см. QueryAdvisor):
+выполняются запросы чтения API и репозиториев, для каждого SELECT строится план,
+последовательное чтение таблиц больше --min-rows строк считается ошибкой
+
+    python -m benchmarks.advisor --min-rows 1000
+"""
+import argparse
+import asyncio
+import sys
+
+import httpx
+from sqlalchemy import func, select, text
+
+from candidates_for_external_lib.sqlalchemy.advisor import QueryAdvisor
+from db import engine, session_factory
+from models import ArticleContent, Section, Subsection
+from shared.repositories.help import ArticleContentRepository, SubsectionRepository
+from web.app import get_app
+
+
+async def run_queries() -> None:
+    async with session_factory() as session:
+        section_id = await session.scalar(select(func.max(Section.id)))
+        subsection_id = await session.scalar(select(func.max(Subsection.id)))
+        article_content_id = await session.scalar(select(func.max(ArticleContent.id)))
+        await SubsectionRepository(session).get_unpublished_names_wo_content(section_id)
+        # у эндпоинта списка контента нет фильтра по подразделу, поэтому выборка подраздела - через QuerySet
+        await ArticleContentRepository(session).objects.filter(subsection_id=subsection_id).order_by("order").options(
+            "widget"
+        ).all()
+    urls = [
+        "/widgets",
+        "/menu",
+        "/section",
+        "/section?page=3&ordering=order",
+        f"/section/{section_id}",
+        "/article_content",
+        f"/article_content/{article_content_id}",
+    ]
+    transport = httpx.ASGITransport(app=get_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://advisor/api") as client:
+        for url in urls:
+            response = await client.get(url)
+            response.raise_for_status()
+
+
+async def main(min_rows: int) -> int:
+    async with engine.connect() as connection:
+        # статистика нужна планировщику и для оценки размера таблиц
+        await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(text("ANALYZE"))
+    async with QueryAdvisor(engine, min_rows=min_rows) as advisor:
+        await run_queries()
+    await engine.dispose()
+    for scan in advisor.seq_scans:
+        print(f"{scan.relation}: {scan.rows} строк, фильтр: {scan.filter}\n    {scan.statement}\n")
+    print(f"Последовательных чтений больших таблиц: {len(advisor.seq_scans)}")
+    return 1 if advisor.seq_scans else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-rows", type=int, default=1000, help="Размер таблицы, начиная с которого seq scan - ошибка")
+    sys.exit(asyncio.run(main(parser.parse_args().min_rows)))
@@ -0,0 +1,282 @@
+"""
+Нагрузочный тест приложения в режиме production (python -m web):
+пропускная способность web.app:get_app под uvicorn с N воркерами.
+
+Для прогона создается БД <database>_loadtest (как в benchmarks.repositories), в нее загружаются данные справки,
+затем запускается python -m web с этой БД и --workers воркерами, и --concurrency клиентов в течение --duration секунд
+выполняют смесь запросов (чтение /section, /article_content, /widgets и запись разделов и контента).
+Во время теста периодически читается /metrics: занятость пула соединений (db_pool_*).
+Метрики prometheus у каждого воркера свои, поэтому заполненность пула - максимум по ответившим воркерам.
+
+В отчете: количество запросов, ошибки, RPS и p50/p95/p99 по каждому типу запроса и в целом.
+Код возврата 1, если доля ошибок больше --max-error-rate или нарушены --slo-p95/--slo-p99 (мс)
+
+    python -m benchmarks.load --workers 4 --concurrency 64 --duration 30 --slo-p99 250
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+from benchmarks.repositories import Volume, create_database, drop_database, seed
+from config import settings
+from db import session_factory
+
+HEALTH_TIMEOUT = 30  # ожидание запуска воркеров, сек
+METRICS_INTERVAL = 1  # период чтения /metrics, сек
+PAGE_SIZE = 20
+
+
+@dataclass
+class Stats:
+    latencies: list[float] = field(default_factory=list)  # сек
+    errors: int = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.latencies) + self.errors
+
+    def percentile(self, percent: int) -> float:
+        if len(self.latencies) < 2:
+            return self.latencies[0] * 1000 if self.latencies else 0
+        return statistics.quantiles(self.latencies, n=100, method="inclusive")[percent - 1] * 1000
+
+
+@dataclass
+class PoolUsage:
+    capacity: int = 0  # pool_size + max_overflow на воркер
+    max_checked_out: int = 0
+    max_overflow: int = 0
+    checkout_seconds_sum: float = 0
+    checkout_count: float = 0
+
+
+class Scenario:
+    """
+    Смесь запросов с весами; идентификаторы выбираются случайно в пределах загруженных данных
+    """
+
+    def __init__(self, volume: Volume):
+        self.volume = volume
+        self.requests = {
+            "GET /section": (30, self.get_sections),
+            "GET /section/{id}": (15, self.get_section),
+            "GET /article_content": (20, self.get_article_contents),
+            "GET /article_content/{id}": (15, self.get_article_content),
+            "GET /widgets": (10, self.get_widgets),
+            "PUT /section/{id}": (5, self.update_section),
+            "POST /article_content": (5, self.create_article_content),
+        }
+        self.names = list(self.requests)
+        self.weights = [weight for weight, _ in self.requests.values()]
+
+    def choose(self) -> tuple[str, Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]]:
+        name = random.choices(self.names, self.weights)[0]
+        return name, self.requests[name][1]
+
+    def get_sections(self, client: httpx.AsyncClient):
+        page = random.randint(1, max(self.volume.sections // PAGE_SIZE, 1))
+        return client.get("/section", params={"page": page, "limit": PAGE_SIZE})
+
+    def get_section(self, client: httpx.AsyncClient):
+        return client.get(f"/section/{random.randint(1, self.volume.sections)}")
+
+    def get_article_contents(self, client: httpx.AsyncClient):
+        page = random.randint(1, 10)
+        return client.get("/article_content", params={"page": page, "limit": PAGE_SIZE})
+
+    def get_article_content(self, client: httpx.AsyncClient):
+        return client.get(f"/article_content/{random.randint(1, self.volume.rows)}")
+
+    def get_widgets(self, client: httpx.AsyncClient):
+        return client.get("/widgets")
+
+    def update_section(self, client: httpx.AsyncClient):
+        section_id = random.randint(1, self.volume.sections)
+        data = {
+            "name": f"Раздел {section_id}",
+            "status": "unpublished",
+            "page_url": f"https://example.com/help/{section_id}",
+            "order": random.randint(0, 100),
+        }
+        return client.put(f"/section/{section_id}", json=data)
+
+    def create_article_content(self, client: httpx.AsyncClient):
+        data = {
+            "subsection_id": random.randint(1, self.volume.subsections),
+            "subtitle": "Подзаголовок",
+            "text": "Текст нагрузочного теста",
+            "video_url": None,
+            "order": 0,
+            "content_type": "text",
+            "image_id": None,
+            "widget_id": 1,
+        }
+        return client.post("/article_content", json=data)
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(database: str, port: int, workers: int, log_level: str) -> subprocess.Popen:
+    # приложение запускается так же, как в production (python -m web), остальные настройки uvicorn берутся из окружения.
+    # журнал запросов на каждый запрос мешает читать отчет, поэтому уровень логов приложения задается отдельно
+    env = {
+        **os.environ,
+        "MY_PROJECT__DB__DATABASE": database,
+        "MY_PROJECT__LOG_LEVEL": log_level,
+        "MY_PROJECT__UVICORN__MODE": "production",
+        "MY_PROJECT__UVICORN__HOST": "127.0.0.1",
+        "MY_PROJECT__UVICORN__PORT": str(port),
+        "MY_PROJECT__UVICORN__WORKERS": str(workers),
+        "MY_PROJECT__UVICORN__LOG_LEVEL": "warning",
+    }
+    return subprocess.Popen([sys.executable, "-m", "web"], env=env)
+
+
+async def wait_for_server(client: httpx.AsyncClient, server: subprocess.Popen) -> None:
+    deadline = time.monotonic() + HEALTH_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn завершился с кодом {server.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 204:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn не запустился")
+
+
+async def run_client(client: httpx.AsyncClient, scenario: Scenario, deadline: float, stats: dict[str, Stats]):
+    while time.monotonic() < deadline:
+        name, request = scenario.choose()
+        started = time.perf_counter()
+        try:
+            response = await request(client)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        if failed:
+            stats[name].errors += 1
+        else:
+            stats[name].latencies.append(time.perf_counter() - started)
+
+
+async def watch_pool(client: httpx.AsyncClient, usage: PoolUsage, pool: str) -> None:
+    while True:
+        await asyncio.sleep(METRICS_INTERVAL)
+        try:
+            response = await client.get("/metrics")
+        except httpx.HTTPError:
+            continue
+        values = {}
+        for family in text_string_to_metric_families(response.text):
+            for sample in family.samples:
+                if sample.labels.get("pool") == pool:
+                    values[sample.name] = sample.value
+        usage.capacity = settings.db.pool_size + settings.db.max_overflow
+        usage.max_checked_out = max(usage.max_checked_out, int(values.get("db_pool_checked_out", 0)))
+        usage.max_overflow = max(usage.max_overflow, int(values.get("db_pool_overflow", 0)))
+        usage.checkout_seconds_sum = values.get("db_pool_checkout_seconds_sum", usage.checkout_seconds_sum)
+        usage.checkout_count = values.get("db_pool_checkout_seconds_count", usage.checkout_count)
+
+
+async def run_load(base_url: str, scenario: Scenario, args: argparse.Namespace) -> tuple[dict[str, Stats], PoolUsage, float]:
+    stats = defaultdict(Stats)
+    usage = PoolUsage()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    api_url = f"{base_url}/{settings.api.root.strip('/')}"
+    async with (
+        httpx.AsyncClient(base_url=api_url, limits=limits, timeout=args.timeout) as client,
+        httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as metrics_client,
+    ):
+        watcher = asyncio.create_task(watch_pool(metrics_client, usage, settings.db.pool_name))
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(run_client(client, scenario, deadline, stats) for _ in range(args.concurrency)))
+        elapsed = time.monotonic() - started
+        watcher.cancel()
+    return stats, usage, elapsed
+
+
+def report(stats: dict[str, Stats], usage: PoolUsage, elapsed: float, args: argparse.Namespace) -> bool:
+    total = Stats()
+    for item in stats.values():
+        total.latencies.extend(item.latencies)
+        total.errors += item.errors
+    print(f"{args.workers} воркеров, {args.concurrency} клиентов, {elapsed:.1f} с")
+    print(f"{'запрос':<28}{'всего':>8}{'ошибок':>8}{'RPS':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, item in [*sorted(stats.items()), ("итого", total)]:
+        print(
+            f"{name:<28}{item.count:>8}{item.errors:>8}{item.count / elapsed:>9.1f}"
+            f"{item.percentile(50):>9.1f}{item.percentile(95):>9.1f}{item.percentile(99):>9.1f}"
+        )
+    if usage.capacity:
+        checkout = usage.checkout_seconds_sum / usage.checkout_count * 1000 if usage.checkout_count else 0
+        print(
+            f"пул {settings.db.pool_name}: занято до {usage.max_checked_out} из {usage.capacity} соединений воркера "
+            f"({usage.max_checked_out / usage.capacity:.0%}), overflow до {usage.max_overflow}, "
+            f"среднее получение соединения {checkout:.2f} мс"
+        )
+
+    passed = True
+    error_rate = total.errors / total.count if total.count else 0
+    if error_rate > args.max_error_rate:
+        print(f"доля ошибок {error_rate:.2%} больше {args.max_error_rate:.2%}")
+        passed = False
+    for percent, slo in ((95, args.slo_p95), (99, args.slo_p99)):
+        if slo is not None and total.percentile(percent) > slo:
+            print(f"p{percent} {total.percentile(percent):.1f} мс больше SLO {slo} мс")
+            passed = False
+    return passed
+
+
+async def main(args: argparse.Namespace) -> int:
+    volume = Volume.for_rows(args.rows)
+    engine = await create_database(f"{settings.db.database}_loadtest")
+    session_factory.configure(bind=engine)
+    port = get_free_port()
+    server = None
+    try:
+        await seed(engine, volume, None)
+        await engine.dispose()
+        server = start_server(engine.url.database, port, args.workers, args.log_level)
+        base_url = f"http://127.0.0.1:{port}"
+        async with httpx.AsyncClient(base_url=f"{base_url}/{settings.api.root.strip('/')}") as client:
+            await wait_for_server(client, server)
+        stats, usage, elapsed = await run_load(base_url, Scenario(volume), args)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        await drop_database(engine)
+    return 0 if report(stats, usage, elapsed, args) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=settings.uvicorn.worker_count, help="Количество воркеров uvicorn")
+    parser.add_argument("--concurrency", type=int, default=32, help="Количество одновременных клиентов")
+    parser.add_argument("--duration", type=float, default=30, help="Длительность нагрузки, сек")
+    parser.add_argument("--rows", type=int, default=100_000, help="Объем ArticleContent в БД")
+    parser.add_argument("--timeout", type=float, default=10, help="Таймаут запроса, сек")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Допустимая доля ошибок")
+    parser.add_argument("--log-level", default="WARNING", help="Уровень логов приложения")
+    parser.add_argument("--slo-p95", type=float, help="Порог p95, мс")
+    parser.add_argument("--slo-p99", type=float, help="Порог p99, мс")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,101 @@
+"""
+Накладные расходы миддлварей на запрос: приложение без миддлварей,
+миддлварь через app.middleware("http") (BaseHTTPMiddleware) и стек чистых ASGI-миддлварей
+(идентификатор запроса, Server-Timing, журнал запросов через очередь).
+Приложение отвечает пустым ответом, поэтому измеряется только стоимость миддлварей
+
+    python -m benchmarks.middlewares
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+from starlette.routing import Route
+
+from candidates_for_external_lib.logs import QueueLogging
+from candidates_for_external_lib.middlewares import AccessLogMiddleware, RequestIdMiddleware, TimingMiddleware
+
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/",
+    "raw_path": b"/",
+    "root_path": "",
+    "query_string": b"",
+    "headers": [(b"host", b"localhost")],
+    "client": ("127.0.0.1", 50000),
+    "server": ("localhost", 8000),
+}
+
+
+async def endpoint(request):
+    return Response()
+
+
+async def noop_dispatch(request, call_next):
+    return await call_next(request)
+
+
+def get_apps() -> dict[str, Starlette]:
+    routes = [Route("/", endpoint)]
+    return {
+        "без миддлварей": Starlette(routes=routes),
+        "BaseHTTPMiddleware": Starlette(routes=routes, middleware=[Middleware(BaseHTTPMiddleware, dispatch=noop_dispatch)]),
+        "ASGI-миддлвари": Starlette(
+            routes=routes,
+            middleware=[
+                Middleware(RequestIdMiddleware),
+                Middleware(TimingMiddleware),
+                Middleware(AccessLogMiddleware, logger=logging.getLogger("benchmarks.access")),
+            ],
+        ),
+    }
+
+
+async def measure(app: Starlette, number: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(dict(SCOPE), receive, send)  # прогрев: построение стека миддлварей
+    started = time.perf_counter()
+    for _ in range(number):
+        await app(dict(SCOPE), receive, send)
+    return (time.perf_counter() - started) / number * 1_000_000
+
+
+async def run(number: int) -> dict[str, float]:
+    return {name: await measure(app, number) for name, app in get_apps().items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20_000, help="Количество запросов")
+    args = parser.parse_args()
+
+    # журнал пишется в очередь, вывод в отдельном потоке отбрасывается
+    queue_logging = QueueLogging(logging.NullHandler(), loggers=("benchmarks.access",))
+    queue_logging.start()
+    try:
+        results = asyncio.run(run(args.number))
+    finally:
+        queue_logging.stop()
+
+    baseline = results["без миддлварей"]
+    print(f"{args.number} запросов")
+    for name, elapsed in results.items():
+        print(f"{name:<20} {elapsed:8.1f} мкс/запрос  +{elapsed - baseline:.1f} мкс")
+
+
+if __name__ == "__main__":
+    main()
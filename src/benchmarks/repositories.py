@@ -0,0 +1,381 @@
+"""
+Производительность слоя репозиториев на разных объемах контента статей:
+QuerySet (filter, order_by, options), BaseRepository.get_list с фильтрацией и пагинацией
+и эндпоинты справки целиком через httpx.ASGITransport.
+
+Для прогона создается отдельная БД <database>_benchmarks на сервере из настроек (удаляется после прогона,
+если не указан --keep), таблицы создаются по моделям, данные загружаются через COPY (bulk_create).
+Для каждого объема ArticleContent время раскладывается на этапы (медиана, мс):
+build - построение выражения, db - выполнение SQL-запросов (по событиям движка, см. QueryStats),
+orm - остальное время выполнения (загрузка объектов, для эндпоинтов - весь код приложения), serialize - dump_json.
+Кэши ответов и справочников сбрасываются перед каждым повтором; эндпоинты с кэшем дополнительно замеряются
+с заполненным кэшем (случаи *.cached).
+Результаты можно сохранить как базовые (--save-baseline) и сравнить с ними следующий прогон (--baseline):
+замедление total больше --tolerance считается регрессией, код возврата - 1
+
+    python -m benchmarks.repositories --rows 10000 100000 1000000 --save-baseline baseline.json
+    python -m benchmarks.repositories --rows 10000 100000 1000000 --baseline baseline.json
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import httpx
+import orjson
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from candidates_for_external_lib.pagination import CursorPagination, PageNumberPagination
+from candidates_for_external_lib.responses.json import dump_json
+from candidates_for_external_lib.responses.paginated import CursorPaginatedResponse, PaginatedResponse
+from candidates_for_external_lib.sqlalchemy.models.base import Base
+from candidates_for_external_lib.sqlalchemy.stats import instrument_engine, query_stats
+from config import settings
+from db import session_factory
+from models import Widget
+from models.help import ReferenceInfoStatus
+from shared.repositories.help import (
+    ArticleContentRepository,
+    MenuRepository,
+    SectionsRepository,
+    SubsectionRepository,
+    WidgetsRepository,
+    menu_cache,
+)
+from web.api.help.cache import article_content_responses, sections_responses
+from web.api.help.filters import ArticleContentFilters
+from web.api.help.schemas import RetrieveArticleContentSchema
+from web.app import get_app
+
+ARTICLE_CONTENTS_PER_SUBSECTION = 10
+SUBSECTIONS_PER_SECTION = 10
+WIDGETS = 5
+MENU_ITEMS = 30
+MENU_CHILDREN = 5  # пункт n вложен в пункт n // MENU_CHILDREN
+COPY_BATCH_SIZE = 50_000
+PAGE_SIZE = 100
+PHASES = ("build", "db", "orm", "serialize", "total")
+# эндпоинты с кэшем ответов или справочников: замеряются и без кэша (кэши сбрасываются перед каждым повтором),
+# и с кэшем - случай с суффиксом .cached
+CACHED_ENDPOINTS = ("api.article_content.retrieve", "api.section.list", "api.section.retrieve", "api.menu")
+CACHED_SUFFIX = ".cached"
+
+
+@dataclass
+class Measurement:
+    # длительности этапов одного выполнения, сек
+    build: float | None = None
+    db: float = 0
+    orm: float = 0
+    serialize: float | None = None
+
+    @property
+    def total(self) -> float:
+        return (self.build or 0) + self.db + self.orm + (self.serialize or 0)
+
+
+@dataclass
+class Result:
+    measurements: list[Measurement] = field(default_factory=list)
+
+    def median(self, phase: str) -> float | None:
+        values = [getattr(measurement, phase) for measurement in self.measurements]
+        if any(value is None for value in values):
+            return None
+        return statistics.median(values) * 1000
+
+    def as_dict(self) -> dict[str, float | None]:
+        return {phase: self.median(phase) for phase in PHASES}
+
+
+@dataclass
+class Volume:
+    rows: int
+    sections: int
+    subsections: int
+
+    @classmethod
+    def for_rows(cls, rows: int) -> "Volume":
+        subsections = max(rows // ARTICLE_CONTENTS_PER_SUBSECTION, 1)
+        return cls(rows=rows, sections=max(subsections // SUBSECTIONS_PER_SECTION, 1), subsections=subsections)
+
+
+async def timed(func: Callable[[], Awaitable[Any]]) -> tuple[Any, float, float]:
+    # результат, общее время и время SQL-запросов
+    with query_stats() as stats:
+        started = time.perf_counter()
+        result = await func()
+        elapsed = time.perf_counter() - started
+    return result, elapsed, stats.duration
+
+
+async def measure_queryset(session: AsyncSession, build: Callable[[], Any], schema: Any) -> Measurement:
+    # выражение выполняется так же, как в QuerySet.all, но построение замеряется отдельно
+    started = time.perf_counter()
+    stmt = build()._build_stmt()
+    build_time = time.perf_counter() - started
+
+    async def execute():
+        result = await session.scalars(stmt)
+        return result.unique().all()
+
+    entries, elapsed, db_time = await timed(execute)
+    started = time.perf_counter()
+    dump_json(schema, entries)
+    return Measurement(build_time, db_time, elapsed - db_time, time.perf_counter() - started)
+
+
+async def measure_get_list(session: AsyncSession, get_page: Callable[[], Awaitable[Any]], schema: Any) -> Measurement:
+    # выражение строится внутри get_list, поэтому его построение входит в orm
+    page, elapsed, db_time = await timed(get_page)
+    started = time.perf_counter()
+    dump_json(schema, page)
+    return Measurement(None, db_time, elapsed - db_time, time.perf_counter() - started)
+
+
+async def measure_endpoint(client: httpx.AsyncClient, url: str) -> Measurement:
+    async def request():
+        response = await client.get(url)
+        response.raise_for_status()
+        return response
+
+    _, elapsed, db_time = await timed(request)
+    return Measurement(None, db_time, elapsed - db_time)
+
+
+def get_cases(volume: Volume, client: httpx.AsyncClient) -> dict[str, Callable[[AsyncSession], Awaitable[Measurement]]]:
+    subsection_id = volume.subsections // 2 + 1
+    section_id = volume.sections // 2 + 1
+    middle_page = max(volume.rows // PAGE_SIZE // 2, 1)
+    article_content_id = volume.rows // 2 + 1
+    page_schema = PaginatedResponse[RetrieveArticleContentSchema]
+
+    def get_filtering() -> ArticleContentFilters:
+        return ArticleContentFilters(ordering=["id"])
+
+    cases = {
+        "queryset.filter": lambda session: measure_queryset(
+            session,
+            lambda: ArticleContentRepository(session)
+            .objects.filter(subsection_id=subsection_id)
+            .order_by("order")
+            .options("widget"),
+            list[RetrieveArticleContentSchema],
+        ),
+        "queryset.filter.related": lambda session: measure_queryset(
+            session,
+            lambda: ArticleContentRepository(session)
+            .objects.filter(subsection__section_id=section_id, subsection__deleted_at__isnull=True)
+            .order_by("subsection__order", "order")
+            .options("widget"),
+            list[RetrieveArticleContentSchema],
+        ),
+        "get_list.page_first": lambda session: measure_get_list(
+            session,
+            lambda: ArticleContentRepository(session).get_list_w_widgets(
+                get_filtering(), PageNumberPagination(page=1, limit=PAGE_SIZE)
+            ),
+            page_schema,
+        ),
+        "get_list.page_middle": lambda session: measure_get_list(
+            session,
+            lambda: ArticleContentRepository(session).get_list_w_widgets(
+                get_filtering(), PageNumberPagination(page=middle_page, limit=PAGE_SIZE)
+            ),
+            page_schema,
+        ),
+        "get_list.cursor": lambda session: measure_get_list(
+            session,
+            lambda: ArticleContentRepository(session).get_list_w_widgets(
+                get_filtering(), CursorPagination(limit=PAGE_SIZE)
+            ),
+            CursorPaginatedResponse[RetrieveArticleContentSchema],
+        ),
+        "api.article_content.page_first": lambda _: measure_endpoint(client, f"/article_content?limit={PAGE_SIZE}"),
+        "api.article_content.page_middle": lambda _: measure_endpoint(
+            client, f"/article_content?page={middle_page}&limit={PAGE_SIZE}"
+        ),
+        "api.article_content.retrieve": lambda _: measure_endpoint(client, f"/article_content/{article_content_id}"),
+        "api.section.list": lambda _: measure_endpoint(client, f"/section?limit={PAGE_SIZE}"),
+        "api.section.retrieve": lambda _: measure_endpoint(client, f"/section/{section_id}"),
+        "api.menu": lambda _: measure_endpoint(client, "/menu"),
+    }
+    for name in CACHED_ENDPOINTS:
+        cases[name + CACHED_SUFFIX] = cases[name]
+    return cases
+
+
+async def clear_caches() -> None:
+    sections_responses.clear()
+    article_content_responses.clear()
+    await menu_cache.invalidate()
+    await WidgetsRepository.cache.invalidate()
+
+
+async def create_database(name: str) -> AsyncEngine:
+    server_engine = create_async_engine(settings.db.dsn.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    async with server_engine.connect() as connection:
+        await connection.exec_driver_sql(f'DROP DATABASE IF EXISTS "{name}"')
+        await connection.exec_driver_sql(f'CREATE DATABASE "{name}"')
+    await server_engine.dispose()
+    engine = create_async_engine(settings.db.dsn.set(database=name), **settings.db.engine_options)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    return engine
+
+
+async def drop_database(engine: AsyncEngine) -> None:
+    name = engine.url.database
+    await engine.dispose()
+    server_engine = create_async_engine(settings.db.dsn.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    async with server_engine.connect() as connection:
+        await connection.exec_driver_sql(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+    await server_engine.dispose()
+
+
+async def seed(engine: AsyncEngine, volume: Volume, previous: Volume | None) -> None:
+    # объемы растут, поэтому догружаются только недостающие записи; БД новая, идентификаторы идут с 1
+    async with session_factory() as session:
+        if previous is None:
+            session.add_all(Widget(name=f"Виджет {number}", code=f"widget-{number}") for number in range(1, WIDGETS + 1))
+            await MenuRepository(session).bulk_create(
+                [
+                    {
+                        "parent_id": number // MENU_CHILDREN or None,
+                        "name": f"menu-{number}",
+                        "description": f"Пункт меню {number}",
+                        "order": number,
+                    }
+                    for number in range(1, MENU_ITEMS + 1)
+                ],
+                returning=False,
+            )
+        start = previous.sections if previous else 0
+        await SectionsRepository(session).bulk_create(
+            [
+                {
+                    "name": f"Раздел {number}",
+                    "status": ReferenceInfoStatus.published,
+                    "page_url": f"https://example.com/help/{number}",
+                    "order": number,
+                }
+                for number in range(start + 1, volume.sections + 1)
+            ],
+            returning=False,
+        )
+        start = previous.subsections if previous else 0
+        await SubsectionRepository(session).bulk_create(
+            [
+                {
+                    "section_id": number % volume.sections + 1,
+                    "name": f"Подраздел {number}",
+                    "status": ReferenceInfoStatus.published,
+                    "order": number,
+                }
+                for number in range(start + 1, volume.subsections + 1)
+            ],
+            returning=False,
+        )
+        start = previous.rows if previous else 0
+        repository = ArticleContentRepository(session)
+        for batch_start in range(start, volume.rows, COPY_BATCH_SIZE):
+            batch_end = min(batch_start + COPY_BATCH_SIZE, volume.rows)
+            await repository.bulk_create(
+                [
+                    {
+                        "subsection_id": number % volume.subsections + 1,
+                        "order": number % ARTICLE_CONTENTS_PER_SUBSECTION,
+                        "content_type": "text",
+                        "text": f"Текст статьи {number}",
+                        "widget_id": number % WIDGETS + 1 if number % 3 == 0 else None,
+                    }
+                    for number in range(batch_start + 1, batch_end + 1)
+                ],
+                returning=False,
+            )
+    async with engine.connect() as connection:
+        await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(text("VACUUM ANALYZE"))
+
+
+async def run_volume(volume: Volume, client: httpx.AsyncClient, number: int) -> dict[str, Result]:
+    results = {}
+    for name, case in get_cases(volume, client).items():
+        result = results[name] = Result()
+        for repeat in range(number + 1):
+            # прогрев заполняет кэши для случаев .cached, остальные выполняются без кэша
+            if not repeat or not name.endswith(CACHED_SUFFIX):
+                await clear_caches()
+            async with session_factory() as session:
+                measurement = await case(session)
+            if repeat:  # первое выполнение - прогрев: кэши выражений, соединения пула
+                result.measurements.append(measurement)
+    return results
+
+
+def format_ms(value: float | None) -> str:
+    return f"{value:9.2f}" if value is not None else f"{'-':>9}"
+
+
+def report(results: dict[str, dict[str, float | None]], baseline: dict | None, tolerance: float) -> list[str]:
+    regressions = []
+    print(f"{'случай':<40}" + "".join(f"{phase:>10}" for phase in PHASES) + ("  к базовому" if baseline else ""))
+    for key, phases in results.items():
+        line = f"{key:<40}" + "".join(f" {format_ms(phases[phase])}" for phase in PHASES)
+        if baseline and key in baseline:
+            ratio = phases["total"] / baseline[key]["total"]
+            line += f"  x{ratio:.2f}"
+            if ratio > 1 + tolerance:
+                line += " РЕГРЕССИЯ"
+                regressions.append(key)
+        print(line)
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    baseline = orjson.loads(Path(args.baseline).read_bytes()) if args.baseline else None
+    engine = await create_database(f"{settings.db.database}_benchmarks")
+    instrument_engine(engine)
+    # эндпоинты получают сессии из общей фабрики, поэтому она переключается на БД прогона
+    session_factory.configure(bind=engine)
+    results = {}
+    transport = httpx.ASGITransport(app=get_app())
+    base_url = f"http://benchmarks/{settings.api.root.strip('/')}"
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url) as client:
+            previous = None
+            for rows in sorted(args.rows):
+                volume = Volume.for_rows(rows)
+                started = time.perf_counter()
+                await seed(engine, volume, previous)
+                print(f"{rows} строк ArticleContent загружено за {time.perf_counter() - started:.1f} с", file=sys.stderr)
+                for name, result in (await run_volume(volume, client, args.number)).items():
+                    results[f"{rows}:{name}"] = result.as_dict()
+                previous = volume
+    finally:
+        if args.keep:
+            await engine.dispose()
+        else:
+            await drop_database(engine)
+    regressions = report(results, baseline, args.tolerance)
+    if args.save_baseline:
+        Path(args.save_baseline).write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Объемы ArticleContent"
+    )
+    parser.add_argument("--number", type=int, default=20, help="Количество повторов каждого случая")
+    parser.add_argument("--baseline", help="JSON с базовыми результатами для сравнения")
+    parser.add_argument("--save-baseline", help="Сохранить результаты прогона как базовые")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Допустимое замедление total, доля")
+    parser.add_argument("--keep", action="store_true", help="Не удалять БД после прогона")
+    sys.exit(asyncio.run(main(parser.parse_args())))
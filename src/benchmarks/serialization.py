@@ -0,0 +1,91 @@
+"""
+Сравнение способов сериализации страницы PaginatedResponse[RetrieveSectionSchema]:
+
+- стандартный путь fastapi: валидация response_model, jsonable_encoder, json.dumps (JSONResponse);
+- тот же путь с ORJSONResponse (default_response_class приложения);
+- прямая сериализация схемой в байты (ModelResponse, ResponseCache.store).
+
+    python -m benchmarks.serialization
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from candidates_for_external_lib.responses.json import dump_json
+from candidates_for_external_lib.responses.paginated import PaginatedResponse
+from models.help import ReferenceInfoStatus, Section, Subsection
+from web.api.help.schemas import RetrieveSectionSchema
+
+
+def get_page(size: int, subsections: int) -> dict:
+    # объекты не привязаны к сессии: измеряется только сериализация, без обращений к БД
+    sections = [
+        Section(
+            id=section_id,
+            code=f"section-{section_id}",
+            name=f"Раздел {section_id}",
+            status=ReferenceInfoStatus.published,
+            page_url=f"https://example.com/help/{section_id}",
+            order=section_id,
+            subsections=[
+                Subsection(
+                    id=section_id * subsections + number,
+                    code=f"subsection-{section_id}-{number}",
+                    name=f"Подраздел {number}",
+                    status=ReferenceInfoStatus.published,
+                    order=number,
+                )
+                for number in range(subsections)
+            ],
+        )
+        for section_id in range(size)
+    ]
+    return {"count": size, "results": sections}
+
+
+def measure(func, number: int) -> float:
+    func()  # прогрев: построение валидаторов и сериализаторов схемы
+    started = time.perf_counter()
+    for _ in range(number):
+        func()
+    return (time.perf_counter() - started) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100, help="Количество разделов на странице")
+    parser.add_argument("--subsections", type=int, default=5, help="Количество подразделов у раздела")
+    parser.add_argument("--number", type=int, default=200, help="Количество повторов")
+    args = parser.parse_args()
+
+    schema = PaginatedResponse[RetrieveSectionSchema]
+    page = get_page(args.size, args.subsections)
+    field = create_model_field(name="response", type_=schema, mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def fastapi_path(response_class):
+        def serialize():
+            content = loop.run_until_complete(serialize_response(field=field, response_content=page))
+            return response_class(content).body
+
+        return serialize
+
+    results = {
+        "fastapi + JSONResponse": measure(fastapi_path(JSONResponse), args.number),
+        "fastapi + ORJSONResponse": measure(fastapi_path(ORJSONResponse), args.number),
+        "TypeAdapter.dump_json": measure(lambda: dump_json(schema, page), args.number),
+    }
+    loop.close()
+
+    baseline = results["fastapi + JSONResponse"]
+    print(f"{args.size} разделов по {args.subsections} подразделов, {args.number} повторов")
+    for name, elapsed in results.items():
+        print(f"{name:<28} {elapsed:8.3f} мс  x{baseline / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import logging
+from collections import OrderedDict
+from time import monotonic
+from typing import Any
+
+import orjson
+from prometheus_client import Counter
+from redis import RedisError
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter(
+    "reference_cache_requests_total",
+    "Обращения к кэшу справочных данных",
+    ["cache", "tier", "result"],
+)
+
+
+class LocalCache:
+    """
+    Кэш в памяти процесса: записи живут не дольше ttl секунд,
+    при превышении maxsize вытесняются давно не использовавшиеся
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._data[key] = (monotonic() + self._ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class RedisCache:
+    """
+    Общий для всех процессов кэш в Redis: записи пространства имен хранятся в одном хэше,
+    поэтому сбрасываются одной командой
+    """
+
+    def __init__(self, client: Redis, ttl: int, key_prefix: str = "cache"):
+        self._client = client
+        self._ttl = ttl
+        self._key_prefix = key_prefix
+
+    async def get(self, namespace: str, key: str) -> Any:
+        value = await self._client.hget(self._get_name(namespace), key)
+        return None if value is None else orjson.loads(value)
+
+    async def set(self, namespace: str, key: str, value: Any) -> None:
+        name = self._get_name(namespace)
+        async with self._client.pipeline(transaction=False) as pipeline:
+            pipeline.hset(name, key, orjson.dumps(value))
+            pipeline.expire(name, self._ttl, nx=True)
+            await pipeline.execute()
+
+    async def clear(self, namespace: str) -> None:
+        await self._client.delete(self._get_name(namespace))
+
+    def _get_name(self, namespace: str) -> str:
+        return f"{self._key_prefix}:{namespace}"
+
+
+class ReferenceCache:
+    """
+    Двухуровневый кэш редко меняющихся данных: память процесса, затем (если передан) Redis.
+    Значения должны сериализоваться в json. Недоступность Redis не приводит к ошибке - это промах кэша
+    """
+
+    def __init__(self, name: str, local: LocalCache, redis: RedisCache | None = None):
+        self.name = name
+        self._local = local
+        self._redis = redis
+
+    async def get(self, key: str) -> Any:
+        value = self._local.get(key)
+        self._observe("local", value)
+        if value is not None or self._redis is None:
+            return value
+        try:
+            value = await self._redis.get(self.name, key)
+        except RedisError:
+            logger.warning("Не удалось получить значение из кэша %s", self.name, exc_info=True)
+            return None
+        self._observe("redis", value)
+        if value is not None:
+            self._local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self._local.set(key, value)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(self.name, key, value)
+        except RedisError:
+            logger.warning("Не удалось сохранить значение в кэш %s", self.name, exc_info=True)
+
+    def invalidate_local(self) -> None:
+        self._local.clear()
+
+    async def invalidate(self) -> None:
+        # кэши памяти других процессов сбросятся по истечении ttl
+        self._local.clear()
+        if self._redis is None:
+            return
+        try:
+            await self._redis.clear(self.name)
+        except RedisError:
+            logger.warning("Не удалось сбросить кэш %s", self.name, exc_info=True)
+
+    def _observe(self, tier: str, value: Any) -> None:
+        CACHE_REQUESTS.labels(cache=self.name, tier=tier, result="miss" if value is None else "hit").inc()
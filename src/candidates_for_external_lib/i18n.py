@@ -0,0 +1,91 @@
+import re
+from functools import lru_cache
+from typing import Any
+
+PLACEHOLDER = "{}"
+
+
+class Translator:
+    """
+    Перевод сообщений об ошибках валидации pydantic, совместимый по формату словаря переводов с PydanticI18n:
+    {"ru_RU": {"Input should be '{}' or '{}'": "Ожидается значение '{}' или '{}'"}}.
+    Сообщения без подстановок ищутся в словаре, шаблоны компилируются один раз при создании,
+    результаты перевода и выбора языка по Accept-Language кэшируются
+    """
+
+    def __init__(
+        self,
+        translations: dict[str, dict[str, str]],
+        default_locale: str,
+        source_locale: str = "en_US",
+        cache_size: int = 1024,
+    ):
+        self.default_locale = default_locale
+        self.source_locale = source_locale
+        self._exact = {
+            locale: {message: translated for message, translated in messages.items() if PLACEHOLDER not in message}
+            for locale, messages in translations.items()
+        }
+        self._templates = {
+            locale: [
+                (self._compile(message), translated) for message, translated in messages.items() if PLACEHOLDER in message
+            ]
+            for locale, messages in translations.items()
+        }
+        # язык тега Accept-Language (en, en_us) -> локаль; первая локаль языка считается основной
+        self._tags = {}
+        for locale in (source_locale, *translations):
+            self._tags.setdefault(locale.lower(), locale)
+            self._tags.setdefault(locale.split("_")[0].lower(), locale)
+        # сообщения и заголовки приходят от клиента, поэтому размер кэшей ограничен
+        self.translate_message = lru_cache(maxsize=cache_size)(self._translate_message)
+        self.negotiate = lru_cache(maxsize=cache_size)(self._negotiate)
+
+    @property
+    def locales(self) -> tuple[str, ...]:
+        return tuple(dict.fromkeys(self._tags.values()))
+
+    def translate(self, errors: list[dict[str, Any]], locale: str | None = None) -> list[dict[str, Any]]:
+        locale = locale or self.default_locale
+        return [{**error, "msg": self.translate_message(error["msg"], locale)} for error in errors]
+
+    def _translate_message(self, message: str, locale: str) -> str:
+        exact = self._exact.get(locale)
+        if exact is None:
+            return message
+        translated = exact.get(message)
+        if translated is not None:
+            return translated
+        for pattern, template in self._templates[locale]:
+            match = pattern.fullmatch(message)
+            if match:
+                try:
+                    return template.format(*match.groups())
+                except IndexError:
+                    # в переводе больше подстановок, чем в исходном сообщении
+                    return message
+        return message
+
+    def _negotiate(self, accept_language: str | None) -> str:
+        # "en-US,en;q=0.9,ru;q=0.8" -> локаль с наибольшим весом из поддерживаемых, иначе локаль по умолчанию
+        if not accept_language:
+            return self.default_locale
+        result, result_quality = self.default_locale, 0.0
+        for item in accept_language.split(","):
+            tag, _, params = item.partition(";")
+            quality = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    continue
+            tag = tag.strip().replace("-", "_").lower()
+            locale = self._tags.get(tag) or self._tags.get(tag.split("_")[0])
+            if locale is not None and quality > result_quality:
+                result, result_quality = locale, quality
+        return result
+
+    @staticmethod
+    def _compile(message: str) -> re.Pattern:
+        return re.compile("(.+?)".join(re.escape(part) for part in message.split(PLACEHOLDER)), re.DOTALL)
@@ -0,0 +1,40 @@
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+from candidates_for_external_lib.middlewares import request_id_var
+
+
+class RequestIdFilter(logging.Filter):
+    # добавляет в запись идентификатор текущего запроса: %(request_id)s в формате
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class QueueLogging:
+    """
+    Неблокирующее логирование: в обработчике запроса запись только кладется в очередь,
+    а форматирование и вывод обработчиками (handlers) выполняются в отдельном потоке QueueListener.
+    Запускается и останавливается в lifespan приложения; при остановке оставшиеся записи дописываются
+    """
+
+    def __init__(self, *handlers: logging.Handler, loggers: tuple[str, ...] = ("",), level: int | str = logging.INFO):
+        self._queue = queue.SimpleQueue()
+        self._queue_handler = QueueHandler(self._queue)
+        # фильтр выполняется в потоке запроса, поэтому контекстные переменные еще доступны
+        self._queue_handler.addFilter(RequestIdFilter())
+        self._listener = QueueListener(self._queue, *handlers, respect_handler_level=True)
+        self._loggers = [logging.getLogger(name) for name in loggers]
+        self._level = level
+
+    def start(self) -> None:
+        for logger in self._loggers:
+            logger.addHandler(self._queue_handler)
+            logger.setLevel(self._level)
+        self._listener.start()
+
+    def stop(self) -> None:
+        for logger in self._loggers:
+            logger.removeHandler(self._queue_handler)
+        self._listener.stop()
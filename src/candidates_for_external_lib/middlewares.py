@@ -0,0 +1,174 @@
+"""
+Миддлвари в виде чистых ASGI-приложений.
+В отличие от app.middleware("http") (BaseHTTPMiddleware) они не создают на запрос отдельную задачу
+и потоки для передачи тела ответа, а только оборачивают send
+"""
+import logging
+import re
+import time
+import uuid
+from contextvars import ContextVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from candidates_for_external_lib.sqlalchemy.stats import STATE_KEY, query_stats
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+REQUEST_ID_PATTERN = re.compile(r"[\w.:-]{1,128}")
+
+
+def append_header(message: Message, name: bytes, value: bytes) -> None:
+    headers = list(message.get("headers", ()))
+    headers.append((name, value))
+    message["headers"] = headers
+
+
+class RequestIdMiddleware:
+    """
+    Идентификатор запроса: берется из заголовка запроса или генерируется,
+    доступен в request.state.request_id и request_id_var (в т.ч. в логах) и возвращается в заголовке ответа
+    """
+
+    def __init__(self, app: ASGIApp, header_name: str = "x-request-id"):
+        self.app = app
+        self.header_name = header_name.lower().encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_id = self._get_request_id(scope)
+        scope.setdefault("state", {})["request_id"] = request_id
+        header_value = request_id.encode()
+
+        async def send_w_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                append_header(message, self.header_name, header_value)
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_w_request_id)
+        finally:
+            request_id_var.reset(token)
+
+    def _get_request_id(self, scope: Scope) -> str:
+        for name, value in scope["headers"]:
+            if name == self.header_name:
+                # значение попадает в логи и ответ, поэтому принимается только "безопасное"
+                request_id = value.decode("latin-1")
+                if REQUEST_ID_PATTERN.fullmatch(request_id):
+                    return request_id
+                break
+        return uuid.uuid4().hex
+
+
+class TimingMiddleware:
+    """
+    Время обработки запроса до отправки заголовков ответа в заголовке Server-Timing: app;dur=12.3
+    """
+
+    def __init__(self, app: ASGIApp, metric_name: str = "app"):
+        self.app = app
+        self.metric_name = metric_name
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+
+        async def send_w_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                duration = (time.perf_counter() - started) * 1000
+                append_header(message, b"server-timing", f"{self.metric_name};dur={duration:.1f}".encode())
+            await send(message)
+
+        await self.app(scope, receive, send_w_timing)
+
+
+class AccessLogMiddleware:
+    """
+    Журнал запросов: метод, путь, статус и длительность.
+    Запись идет через logging, поэтому для неблокирующего вывода логгер должен писать в QueueHandler
+    (см. candidates_for_external_lib.logs.QueueLogging)
+    """
+
+    def __init__(self, app: ASGIApp, logger: logging.Logger | None = None):
+        self.app = app
+        self.logger = logger or logging.getLogger("access")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.logger.isEnabledFor(logging.INFO):
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_w_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_w_status)
+        finally:
+            path = scope["path"]
+            if scope["query_string"]:
+                path = f"{path}?{scope['query_string'].decode('latin-1')}"
+            duration = (time.perf_counter() - started) * 1000
+            self.logger.info("%s %s %s %.1fms", scope["method"], path, status_code, duration)
+
+
+class QueryStatsMiddleware:
+    """
+    Статистика SQL-запросов за запрос (см. candidates_for_external_lib.sqlalchemy.stats):
+    в заголовке Server-Timing: db;dur=4.2;desc="3 queries" (запросы до отправки заголовков ответа),
+    в request.state.query_stats для метрик и в журнале, если запрос превысил один из порогов.
+    Учитываются запросы движков, подключенных через instrument_engine
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        logger: logging.Logger | None = None,
+        slow_queries: int | None = None,
+        slow_duration: float | None = None,  # сек
+        metric_name: str = "db",
+    ):
+        self.app = app
+        self.logger = logger or logging.getLogger("db.stats")
+        self.slow_queries = slow_queries
+        self.slow_duration = slow_duration
+        self.metric_name = metric_name
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with query_stats() as stats:
+            scope.setdefault("state", {})[STATE_KEY] = stats
+
+            async def send_w_timing(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    value = f'{self.metric_name};dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
+                    append_header(message, b"server-timing", value.encode())
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_w_timing)
+            finally:
+                if self._is_slow(stats):
+                    self.logger.warning(
+                        "%s %s: %d SQL-запросов, %.1fms в БД, самый долгий %.1fms: %s",
+                        scope["method"],
+                        scope["path"],
+                        stats.count,
+                        stats.duration * 1000,
+                        stats.slowest_duration * 1000,
+                        stats.slowest_statement,
+                    )
+
+    def _is_slow(self, stats) -> bool:
+        return (self.slow_queries is not None and stats.count > self.slow_queries) or (
+            self.slow_duration is not None and stats.duration > self.slow_duration
+        )
@@ -1,6 +1,12 @@
-from typing import Annotated
+import base64
+import binascii
+from typing import Annotated, Any
 
-from fastapi import Query
+import orjson
+from fastapi import HTTPException, Query
+from sqlalchemy import Select, and_, false, inspect, or_, tuple_
+
+from candidates_for_external_lib.utils.types import to_python_value
 
 # todo: может в отдельный пакет
 
@@ -18,3 +24,102 @@ class PageNumberPagination:
     # todo:
     #  может получиться реализовать применение пагинации как и в случае
     #  с фильтрами и сортировкой, то есть в классе пагинации
+
+
+class CursorPagination:
+    """
+    Keyset-пагинация: вместо OFFSET запрос "продолжается" с позиции последней записи страницы,
+    поэтому время получения страницы не зависит от ее номера.
+    Позиция передается клиенту в виде непрозрачного курсора (значения полей сортировки последней записи)
+    """
+
+    invalid_cursor_error = "Некорректный курсор"
+
+    def __init__(
+        self,
+        cursor: Annotated[str | None, Query()] = None,
+        limit: Annotated[int, Query(gt=0), Query(le=100)] = 10,
+    ):
+        self.limit = limit
+        self.position, self.reverse = self._decode_cursor(cursor) if cursor else (None, False)
+        self._ordering = []
+
+    def paginate(self, query: Select, model, ordering: list[str] | None = None) -> Select:
+        # ordering - поля сортировки в формате fastapi-filter: ["-order", "name"].
+        # первичный ключ всегда добавляется в конец, чтобы позиция в выборке была однозначной
+        self._ordering = self._get_ordering(model, ordering or [])
+        if self.position is not None:
+            if len(self.position) != len(self._ordering):
+                raise HTTPException(status_code=400, detail=self.invalid_cursor_error)
+            try:
+                query = query.where(self._seek(self.position))
+            except (ValueError, TypeError):
+                raise HTTPException(status_code=400, detail=self.invalid_cursor_error)
+        for field_name, column, descending in self._ordering:
+            # для получения предыдущей страницы идем от позиции курсора в обратную сторону
+            query = query.order_by(column.asc() if descending == self.reverse else column.desc())
+        return query.limit(self.limit + 1)
+
+    def get_page(self, entries: list) -> dict[str, Any]:
+        has_more = len(entries) > self.limit
+        entries = list(entries[: self.limit])
+        if self.reverse:
+            entries.reverse()
+        next_cursor = previous_cursor = None
+        if entries:
+            has_next = self.position is not None if self.reverse else has_more
+            has_previous = has_more if self.reverse else self.position is not None
+            if has_next:
+                next_cursor = self._encode_cursor(entries[-1], reverse=False)
+            if has_previous:
+                previous_cursor = self._encode_cursor(entries[0], reverse=True)
+        return {"next": next_cursor, "previous": previous_cursor, "results": entries}
+
+    def _get_ordering(self, model, ordering: list[str]) -> list[tuple[str, Any, bool]]:
+        result = []
+        for field in ordering:
+            field_name = field.lstrip("-+")
+            result.append((field_name, getattr(model, field_name), field.startswith("-")))
+        for pk_column in inspect(model).primary_key:
+            if pk_column.key not in {field_name for field_name, _, _ in result}:
+                result.append((pk_column.key, getattr(model, pk_column.key), False))
+        return result
+
+    def _seek(self, position: list):
+        # (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ... с учетом направления сортировки каждого поля.
+        # NULL в PostgreSQL при сортировке по возрастанию идут последними, по убыванию - первыми
+        values = [to_python_value(column, value) for (_, column, _), value in zip(self._ordering, position)]
+        directions = {descending != self.reverse for _, _, descending in self._ordering}
+        if len(directions) == 1 and not any(column.nullable for _, column, _ in self._ordering) and None not in values:
+            # одно направление и без NULL: сравнение строк (c1, c2) > (v1, v2), которое использует составной индекс
+            columns, values = tuple_(*(column for _, column, _ in self._ordering)), tuple_(*values)
+            return columns < values if directions.pop() else columns > values
+        conditions, equals = [], []
+        for (field_name, column, descending), value in zip(self._ordering, values):
+            conditions.append(and_(*equals, self._after(column, value, descending != self.reverse)))
+            equals.append(column.is_(None) if value is None else column == value)
+        return or_(*conditions)
+
+    @staticmethod
+    def _after(column, value, descending: bool):
+        # для NOT NULL колонок условия на NULL не нужны
+        if descending:
+            return column.is_not(None) if value is None else column < value
+        if value is None:
+            return false()
+        return or_(column > value, column.is_(None)) if column.nullable else column > value
+
+    def _encode_cursor(self, entry, reverse: bool) -> str:
+        position = [getattr(entry, field_name) for field_name, _, _ in self._ordering]
+        payload = orjson.dumps({"p": position, "r": reverse})
+        return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+    def _decode_cursor(self, cursor: str) -> tuple[list, bool]:
+        try:
+            payload = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            position, reverse = payload["p"], payload["r"]
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise HTTPException(status_code=400, detail=self.invalid_cursor_error)
+        if not isinstance(position, list) or not isinstance(reverse, bool):
+            raise HTTPException(status_code=400, detail=self.invalid_cursor_error)
+        return position, reverse
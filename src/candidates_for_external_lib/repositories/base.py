@@ -1,14 +1,29 @@
+import asyncio
 from typing import Any
 
-from sqlalchemy import select, delete, func, literal_column
-from sqlalchemy.ext.asyncio import AsyncSession
+import orjson
+from sqlalchemy import select, delete, func, literal_column, text, insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
-from candidates_for_external_lib.pagination import PageNumberPagination
+from candidates_for_external_lib.pagination import PageNumberPagination, CursorPagination
+from candidates_for_external_lib.repositories.constants import CountMode
 from candidates_for_external_lib.repositories.queryset import QuerySet
+from candidates_for_external_lib.repositories.unit_of_work import in_unit_of_work
+from candidates_for_external_lib.sqlalchemy.changes import mark_changed
 
 
 class BaseRepository:
     model = None
+    # способ подсчета общего количества записей для пагинации по страницам.
+    # может быть переопределен для конкретного вызова get_list
+    count_mode: CountMode = CountMode.exact
+    # при CountMode.estimated оценки меньше порога пересчитываются точно
+    estimated_count_threshold: int = 10_000
+    # bulk_create без возврата записей начиная с такого количества записей использует COPY
+    copy_threshold: int = 1000
+    # поля уникального ограничения, по которому upsert определяет конфликт
+    conflict_fields: tuple[str, ...] = ()
 
     # todo: внедрить django-like фильтрацию?
 
@@ -18,9 +33,98 @@ class BaseRepository:
     async def create(self, **values):
         instance = self.model(**values)
         self._session.add(instance)
-        await self._session.commit()  # todo: пока так. позже подумаю, как внедрить транзакцию
+        await self._commit()
         return instance
 
+    async def _commit(self) -> None:
+        # внутри UnitOfWork изменения только отправляются в БД, зафиксирует их UnitOfWork
+        if in_unit_of_work(self._session):
+            await self._session.flush()
+        else:
+            await self._session.commit()
+
+    async def bulk_create(self, values: list[dict[str, Any]], returning: bool = True) -> list | None:
+        # returning=False позволяет не получать созданные записи обратно,
+        # а для больших пачек - загружать их через COPY
+        instances = [] if returning else None
+        if not values:
+            return instances
+        if returning:
+            result = await self._session.scalars(insert(self.model).returning(self.model), values)
+            instances = result.all()
+        elif len(values) >= self.copy_threshold:
+            await self._copy(values)
+        else:
+            await self._session.execute(insert(self.model), values)
+        await self._commit()
+        return instances
+
+    async def bulk_update(self, values: list[dict[str, Any]]) -> None:
+        # каждый словарь должен содержать первичный ключ: UPDATE выполняется одним executemany
+        if not values:
+            return
+        await self._session.execute(update(self.model), values)
+        await self._commit()
+
+    async def upsert(self, values: list[dict[str, Any]], update_fields: list[str] | None = None) -> list:
+        # INSERT ... ON CONFLICT (conflict_fields) DO UPDATE.
+        # по умолчанию обновляются все переданные поля, кроме полей конфликта
+        if not values:
+            return []
+        if not self.conflict_fields:
+            raise ValueError(f"Не заданы поля конфликта (conflict_fields) для {self.__class__.__name__}")
+        if update_fields is None:
+            update_fields = [field for field in values[0] if field not in self.conflict_fields]
+        stmt = pg_insert(self.model)
+        set_ = {field: stmt.excluded[field] for field in update_fields}
+        # onupdate колонок (updated_at) к ON CONFLICT DO UPDATE сам не применяется
+        for column in self.model.__table__.columns:
+            if column.onupdate is not None and column.onupdate.is_clause_element and column.key not in set_:
+                set_[column.key] = column.onupdate.arg
+        stmt = stmt.on_conflict_do_update(index_elements=self.conflict_fields, set_=set_)
+        result = await self._session.scalars(
+            stmt.returning(self.model), values, execution_options={"populate_existing": True}
+        )
+        instances = result.all()
+        await self._commit()
+        return instances
+
+    async def _copy(self, values: list[dict[str, Any]]) -> None:
+        # COPY не применяет значения по умолчанию, заданные на стороне python, поэтому они подставляются здесь
+        table = self.model.__table__
+        columns = [
+            column
+            for column in table.columns
+            if column.key in values[0] or (column.default is not None and not column.default.is_sequence)
+        ]
+        for column in columns:
+            if column.key not in values[0] and column.default.is_clause_element:
+                # SQL-выражение вычисляется в INSERT для каждой строки, в COPY его не передать
+                raise ValueError(
+                    f"COPY не поддерживает SQL-выражение по умолчанию колонки {table.name}.{column.name}, "
+                    f"значение нужно передать явно"
+                )
+        records = [tuple(self._get_copy_value(row, column) for column in columns) for row in values]
+        connection = await self._session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        if not driver_connection.is_in_transaction():
+            # драйвер открывает транзакцию сессии перед первым запросом, COPY должен попасть в нее же
+            await connection.exec_driver_sql("SELECT 1")
+        await driver_connection.copy_records_to_table(
+            table.name, records=records, columns=[column.name for column in columns], schema_name=table.schema
+        )
+        # COPY не вызывает ни do_orm_execute, ни событий маппера, поэтому кэши модели отмечаются явно
+        mark_changed(self._session.sync_session, self.model)
+
+    @staticmethod
+    def _get_copy_value(row: dict[str, Any], column) -> Any:
+        if column.key in row:
+            return row[column.key]
+        if column.default.is_callable:
+            return column.default.arg(None)
+        return column.default.arg
+
     @property
     def objects(self) -> QuerySet:
         return QuerySet(self.model, self._session)
@@ -37,11 +141,20 @@ class BaseRepository:
     async def delete(self):
         stmt = delete(self.model)
         await self._session.execute(stmt)
-        await self._session.commit()  # todo: пока так. позже подумаю, как внедрить транзакцию
+        await self._commit()
 
-    async def get_list(self, query=None, pagination: PageNumberPagination | None = None, filtering=None):
+    async def get_list(
+        self,
+        query=None,
+        pagination: PageNumberPagination | CursorPagination | None = None,
+        filtering=None,
+        count_mode: CountMode | None = None,
+    ):
         if query is None:
             query = select(self.model)
+        if isinstance(pagination, CursorPagination):
+            return await self._get_cursor_page(query, pagination, filtering)
+        count_mode = count_mode or self.count_mode
         count_query = query.with_only_columns(func.count(literal_column("1")), maintain_column_froms=True)
         if filtering:
             query = filtering.filter(query)
@@ -56,19 +169,106 @@ class BaseRepository:
             #   query = filtering.sort(query)
             offset = (pagination.page - 1) * pagination.limit
             query = query.limit(pagination.limit).offset(offset)
+            if count_mode == CountMode.window:
+                return await self._get_page_w_window_count(query, count_query, offset)
+            if count_mode == CountMode.concurrent:
+                return await self._get_page_w_concurrent_count(query, count_query)
         result = await self._session.scalars(query)
         entries = result.unique().all()
         if pagination:
-            count = await self._session.scalar(count_query)
+            count = await self._count(count_query, count_mode)
             return {"count": count, "results": entries}
         return entries
 
+    async def _get_page_w_window_count(self, query, count_query, offset: int):
+        # общее количество возвращается вместе со страницей, без отдельного запроса.
+        # не подходит для запросов с joinedload коллекций: окно посчитает строки после join-а
+        query = query.add_columns(func.count(literal_column("1")).over().label("total_count"))
+        result = await self._session.execute(query)
+        rows = result.unique().all()
+        if rows:
+            return {"count": rows[0].total_count, "results": [row[0] for row in rows]}
+        # за пределами выборки окно не вернет ни одной строки, поэтому количество считается отдельно
+        count = await self._session.scalar(count_query) if offset else 0
+        return {"count": count, "results": []}
+
+    async def _get_page_w_concurrent_count(self, query, count_query):
+        # подсчет выполняется на отдельном соединении из пула и не видит незакоммиченных изменений сессии,
+        # поэтому режим подходит только для запросов на чтение.
+        # дожидаемся обоих запросов, чтобы соединение для подсчета гарантированно вернулось в пул
+        entries, count = await asyncio.gather(
+            self._fetch_entries(query), self._count_on_separate_connection(count_query), return_exceptions=True
+        )
+        for outcome in (entries, count):
+            if isinstance(outcome, BaseException):
+                raise outcome
+        return {"count": count, "results": entries}
+
+    async def _fetch_entries(self, query) -> list:
+        result = await self._session.scalars(query)
+        return result.unique().all()
+
+    async def _count_on_separate_connection(self, count_query) -> int:
+        # отдельное соединение того же движка, что выбрал бы сеанс (реплика или основная БД)
+        async with self._get_async_engine(count_query).connect() as connection:
+            return await connection.scalar(count_query)
+
+    def _get_async_engine(self, clause) -> AsyncEngine:
+        bind = self._session.get_bind(clause=clause)
+        # используется уже созданный AsyncEngine сессии или набора реплик (см. RoutingSession)
+        replicas = getattr(self._session.sync_session, "replicas", None)
+        for engine in (self._session.bind, *(replicas.engines if replicas is not None else ())):
+            if engine is not None and engine.sync_engine is bind:
+                return engine
+        # иначе (представление движка, например autocommit для READ_ONLY) - обертка над ним с тем же пулом
+        return AsyncEngine(bind)
+
+    async def _count(self, count_query, count_mode: CountMode) -> int:
+        if count_mode == CountMode.estimated:
+            estimated_count = await self._estimate_count(count_query)
+            if estimated_count >= self.estimated_count_threshold:
+                return estimated_count
+        return await self._session.scalar(count_query)
+
+    async def _estimate_count(self, count_query) -> int:
+        froms = count_query.get_final_froms()
+        if count_query.whereclause is None and len(froms) == 1 and froms[0] is self.model.__table__:
+            # без фильтров достаточно статистики таблицы (-1, если таблица еще не анализировалась)
+            stmt = text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table_name AS regclass)")
+            params = {"table_name": self.model.__table__.fullname}
+            return await self._session.scalar(stmt, params, bind_arguments={"clause": count_query}) or 0
+        # иначе берется оценка количества строк из плана запроса
+        stmt = count_query.with_only_columns(literal_column("1"), maintain_column_froms=True)
+        connection = await self._session.connection(bind_arguments={"clause": count_query})
+        compiled = stmt.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+        params = tuple(compiled.params[name] for name in compiled.positiontup or ())
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", params)
+        plan = result.scalar()
+        if isinstance(plan, (str, bytes)):
+            plan = orjson.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    async def _get_cursor_page(self, query, pagination: CursorPagination, filtering=None):
+        # сортировка фильтра не применяется как есть: ее поля становятся ключом keyset-пагинации
+        ordering = None
+        if filtering:
+            query = filtering.filter(query)
+            ordering = filtering.ordering_values
+        query = pagination.paginate(query, self.model, ordering)
+        result = await self._session.scalars(query)
+        return pagination.get_page(result.unique().all())
+
     async def get_by_pk(self, pk_value: int):
         return await self._session.get(self.model, pk_value)
 
     async def delete_by_id(self, id_: Any) -> Any:
         stmt = delete(self.model).where(self.model.id == id_)
         await self._session.execute(stmt)
-        await self._session.commit()  # todo: пока так. позже подумаю, как внедрить транзакцию
+        await self._commit()
+
+    async def delete_by_ids(self, ids: list[Any]) -> None:
+        stmt = delete(self.model).where(self.model.id.in_(ids))
+        await self._session.execute(stmt)
+        await self._commit()
 
     # todo: другие методы
@@ -0,0 +1,81 @@
+import asyncio
+from collections import defaultdict
+from typing import Any
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from candidates_for_external_lib.cache import ReferenceCache
+from candidates_for_external_lib.sqlalchemy.changes import get_changed_models, track_changes
+from candidates_for_external_lib.utils.types import to_python_value
+
+_invalidation_tasks: set[asyncio.Task] = set()
+# кэши, зарегистрированные в invalidate_on_commit, по моделям
+_model_caches: defaultdict[Any, set[ReferenceCache]] = defaultdict(set)
+
+
+class CachedRepositoryMixin:
+    """
+    Кэширование all() и get_by_pk() для небольших, редко меняющихся таблиц (справочников).
+    В кэше хранятся значения колонок, из которых записи восстанавливаются в текущей сессии без запроса в БД.
+    Кэш сбрасывается после фиксации транзакции, изменившей записи модели, поэтому модель с кэшем
+    регистрируется в invalidate_on_commit
+
+        widgets_cache = ReferenceCache("widgets", LocalCache(ttl=60, maxsize=1024))
+        invalidate_on_commit(Widget, widgets_cache)
+
+        class WidgetsRepository(CachedRepositoryMixin, BaseRepository):
+            model = Widget
+            cache = widgets_cache
+    """
+
+    cache: ReferenceCache = None
+
+    async def all(self):
+        if (rows := await self.cache.get("all")) is not None:
+            return [await self._restore(row) for row in rows]
+        instances = await super().all()
+        await self.cache.set("all", [self._dump(instance) for instance in instances])
+        return instances
+
+    async def get_by_pk(self, pk_value: Any):
+        if (row := await self.cache.get(f"pk:{pk_value}")) is not None:
+            return await self._restore(row)
+        instance = await super().get_by_pk(pk_value)
+        if instance is not None:
+            await self.cache.set(f"pk:{pk_value}", self._dump(instance))
+        return instance
+
+    def _dump(self, instance) -> dict[str, Any]:
+        return {attr.key: getattr(instance, attr.key) for attr in inspect(self.model).column_attrs}
+
+    async def _restore(self, row: dict[str, Any]):
+        columns = inspect(self.model).columns
+        instance = self.model(**{key: to_python_value(columns[key], value) for key, value in row.items()})
+        make_transient_to_detached(instance)
+        # merge без загрузки присоединяет запись к сессии (или возвращает уже загруженную) без запроса в БД
+        return await self._session.merge(instance, load=False)
+
+
+def invalidate_on_commit(model, cache: ReferenceCache) -> None:
+    """
+    Сброс кэша после фиксации транзакции, изменившей записи модели любым способом (см. track_changes).
+    Сброс до фиксации позволил бы другому запросу снова закэшировать старые данные
+    """
+    _model_caches[model].add(cache)
+    track_changes(model)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_caches(session: Session) -> None:
+    caches = {cache for model in get_changed_models(session) for cache in _model_caches.get(model, ())}
+    for cache in caches:
+        cache.invalidate_local()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            continue
+        # событие синхронное, сброс в Redis выполняется отдельной задачей
+        task = loop.create_task(cache.invalidate())
+        _invalidation_tasks.add(task)
+        task.add_done_callback(_invalidation_tasks.discard)
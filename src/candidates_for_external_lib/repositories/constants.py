@@ -0,0 +1,10 @@
+from enum import StrEnum
+
+
+class CountMode(StrEnum):
+    exact = "exact"  # отдельный запрос count(*)
+    # count(*) over () в том же запросе, что и страница. окно считает всю выборку на каждой странице,
+    # поэтому режим подходит только для заведомо небольших таблиц
+    window = "window"
+    concurrent = "concurrent"  # отдельный запрос count(*) на другом соединении, параллельно с запросом страницы
+    estimated = "estimated"  # оценка планировщика, для небольших выборок - точный подсчет
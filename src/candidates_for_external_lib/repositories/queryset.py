@@ -1,9 +1,27 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable
+
 from fastapi_filter.contrib.sqlalchemy import Filter
-from sqlalchemy import select, extract, inspect, func, literal_column
+from sqlalchemy import select, extract, inspect, func, literal_column, distinct, tuple_, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload, contains_eager
+from sqlalchemy.orm import joinedload, contains_eager, aliased
 from sqlalchemy.sql import operators
 
+from candidates_for_external_lib.repositories.unit_of_work import in_unit_of_work
+
+
+LOOKUPS_CACHE_SIZE = 1024
+
+
+@dataclass(frozen=True, slots=True)
+class Lookup:
+    # результат разбора строки вида type__code__icontains
+    path: tuple[str, ...]  # имена отношений от исходной модели: ("type",)
+    models: tuple[Any, ...]  # модели, к которым ведут отношения из path
+    attr_name: str  # имя атрибута последней модели: "code"
+    operator: Callable  # оператор: icontains
+
 
 class QuerySet:
     """
@@ -56,6 +74,7 @@ class QuerySet:
         self._session = session
         self._stmt = stmt if stmt is not None else select(self._model)
         self._joins = {}
+        self._has_to_many_joins = False  # есть ли join-ы, размножающие строки исходной модели
         self._options = []
 
     def filter(self, *, filtering: Filter = None, **filters):
@@ -64,24 +83,13 @@ class QuerySet:
         #   first_name__in=["Alex", "John"]
         #   type__code="sh" - through relation
         #   etc
-        # todo:
-        #  цепочечное применение фильтров. обратить внимание на join-ы
+        # повторные вызовы filter и order_by используют уже присоединенные отношения
         for attr, value in filters.items():
-            model = self._model
-            if "__" in attr:
-                for lookup in self._operators:
-                    if attr.endswith(f"__{lookup}"):
-                        op = self._operators[lookup]
-                        attr = attr[:-(len("__") + len(lookup))]
-                        break
-                else:
-                    op = operators.eq
-                column = self._extract_column(attr)
-            else:
-                column = getattr(model, attr)
-                op = operators.eq
-            self._stmt = self._stmt.where(op(column, value))
-        # self._stmt = filtering.filter(self._stmt)
+            lookup = self._resolve_lookup(self._model, attr)
+            column = self._get_column(lookup)
+            self._stmt = self._stmt.where(lookup.operator(column, value))
+        if filtering is not None:
+            self._stmt = filtering.filter(self._stmt)
         return self
 
     def options(self, *args):
@@ -103,73 +111,131 @@ class QuerySet:
         #    type__code - through relation
         #    first_name
         #    etc
-        model = self._model
-        attr_name = None
-        if "__" in field:
-            parts = field.split("__")
-            joins = self._joins
-            relationships = inspect(model).relationships
-            for part in parts:
-                if part in relationships:
-                    joins = joins.setdefault(part, {})
-                    model = relationships[part].mapper.class_
-                    relationships = inspect(model).relationships
-                    self._stmt = self._stmt.join(model)
-                else:
-                    attr_name = part
-        else:
-            attr_name = field
-        return getattr(model, attr_name)
+        return self._get_column(self._resolve_lookup(self._model, field, with_operator=False))
+
+    def _get_column(self, lookup: Lookup):
+        return getattr(self._join(lookup.path, lookup.models), lookup.attr_name)
+
+    def _join(self, path: tuple[str, ...], models: tuple[Any, ...]):
+        # присоединяет отношения пути, которые еще не были присоединены, и возвращает сущность конца пути.
+        # каждое отношение присоединяется один раз под псевдонимом, составленным из пути (subsection__section),
+        # и этот же псевдоним используется в filter, order_by и options
+        entity = self._model
+        for i, (part, model) in enumerate(zip(path, models), start=1):
+            if path[:i] not in self._joins:
+                relationship = getattr(entity, part)
+                alias = aliased(model, name="__".join(path[:i]))
+                self._stmt = self._stmt.join(relationship.of_type(alias))
+                self._joins[path[:i]] = alias
+                self._has_to_many_joins = self._has_to_many_joins or relationship.property.uselist
+            entity = self._joins[path[:i]]
+        return entity
+
+    @classmethod
+    @lru_cache(maxsize=LOOKUPS_CACHE_SIZE)
+    def _resolve_lookup(cls, model, lookup: str, with_operator: bool = True) -> Lookup:
+        # разбор строки лукапа не зависит от запроса, поэтому выполняется один раз для пары (модель, лукап)
+        parts = lookup.split("__")
+        operator = operators.eq
+        if with_operator and len(parts) > 1 and parts[-1] in cls._operators:
+            operator = cls._operators[parts.pop()]
+        path, models = cls._resolve_path(model, "__".join(parts[:-1]))
+        return Lookup(path=path, models=models, attr_name=parts[-1], operator=operator)
 
-    def apply_options(self):
+    @classmethod
+    @lru_cache(maxsize=LOOKUPS_CACHE_SIZE)
+    def _resolve_path(cls, model, path: str) -> tuple[tuple[str, ...], tuple[Any, ...]]:
+        # путь по отношениям: subsection__section -> (("subsection", "section"), (Subsection, Section))
+        parts = tuple(path.split("__")) if path else ()
+        models = []
+        for part in parts:
+            model = inspect(model).relationships[part].mapper.class_
+            models.append(model)
+        return parts, tuple(models)
+
+    def _get_options(self) -> list:
+        # для уже присоединенных отношений данные берутся из join-а (contains_eager),
+        # для остальных добавляется joinedload
+        options = []
         for arg in self._options:
-            joins = self._joins
-            if "__" in arg:
-                first, rest = arg.split("__", 1)
-                start_option_column = getattr(self._model, first)
-                option = contains_eager(start_option_column) if first in joins else joinedload(start_option_column)
-                joins = joins.get(first, {})
-                relationships = inspect(self._model).relationships
-                model = relationships[first].mapper.class_
-                for i in rest.split("__"):
-                    n = getattr(model, i)
-                    if i in joins:
-                        option = option.contains(n)
-                    else:
-                        option = option.joinedload(n)
-                    relationships = inspect(model).relationships
-                    model = relationships[i].mapper.class_
-            else:
-                start_option_column = getattr(self._model, arg)
-                option = contains_eager(start_option_column) if arg in joins else joinedload(start_option_column)
-            self._stmt = self._stmt.options(option)
+            path, models = self._resolve_path(self._model, arg)
+            entity, option = self._model, None
+            for i, (part, model) in enumerate(zip(path, models), start=1):
+                attr = getattr(entity, part)
+                if alias := self._joins.get(path[:i]):
+                    attr, entity = attr.of_type(alias), alias
+                    option = contains_eager(attr) if option is None else option.contains_eager(attr)
+                else:
+                    entity = model
+                    option = joinedload(attr) if option is None else option.joinedload(attr)
+            options.append(option)
+        return options
 
     def _build_stmt(self):
         # builds final statement
-        self.apply_options()
+        return self._stmt.options(*self._get_options())
 
     async def all(self):
-        self._build_stmt()
-        result = await self._session.scalars(self._stmt)
-        return result.all()
+        result = await self._session.scalars(self._build_stmt())
+        return result.unique().all()
+
+    async def stream(self, yield_per: int = 1000) -> AsyncIterator:
+        # записи читаются через серверный курсор порциями по yield_per, в памяти только текущая порция.
+        # joinedload коллекций с yield_per несовместим: для них нужен selectinload в options запроса
+        result = await self._session.stream_scalars(self._build_stmt().execution_options(yield_per=yield_per))
+        async for entry in result:
+            yield entry
 
     async def first(self):
-        self._build_stmt()
-        stmt = self._stmt.limit(1)
+        stmt = self._build_stmt().limit(1)
         return await self._session.scalar(stmt)
 
     async def count(self):
-        self._build_stmt()
-        stmt = self._stmt.with_only_columns(func.count(literal_column("1")), maintain_column_froms=True)
+        # сортировка и жадная загрузка на количество не влияют, поэтому в запрос не попадают.
+        # distinct по первичному ключу нужен, только если join по отношению "один ко многим" размножает строки
+        if self._has_to_many_joins:
+            pk = inspect(self._model).primary_key
+            count = func.count(distinct(pk[0] if len(pk) == 1 else tuple_(*pk)))
+        else:
+            count = func.count(literal_column("1"))
+        stmt = self._stmt.with_only_columns(count, maintain_column_froms=True).order_by(None)
         return await self._session.scalar(stmt)
 
     async def exists(self):
-        count = await self.count()
-        return count > 0
+        # SELECT EXISTS (SELECT 1 ... LIMIT 1): поиск прекращается на первой найденной записи
+        stmt = self._stmt.with_only_columns(literal_column("1"), maintain_column_froms=True).order_by(None).limit(1)
+        return await self._session.scalar(select(stmt.exists()))
 
     async def scalar(self):
-        self._build_stmt()
-        return await self._session.scalar(self._stmt)
+        return await self._session.scalar(self._build_stmt())
+
+    async def update(self, **values) -> int:
+        # один UPDATE на все записи, подходящие под фильтры
+        stmt = update(self._model).where(*self._get_write_criteria()).values(**values)
+        result = await self._session.execute(stmt)
+        await self._commit()
+        return result.rowcount
+
+    async def delete(self) -> int:
+        # один DELETE на все записи, подходящие под фильтры
+        stmt = delete(self._model).where(*self._get_write_criteria())
+        result = await self._session.execute(stmt)
+        await self._commit()
+        return result.rowcount
+
+    async def _commit(self) -> None:
+        # как в репозитории: вне UnitOfWork изменения фиксируются сразу,
+        # внутри UnitOfWork запрос уже выполнен в его транзакции, зафиксирует ее UnitOfWork
+        if not in_unit_of_work(self._session):
+            await self._session.commit()
+
+    def _get_write_criteria(self) -> list:
+        if not self._joins:
+            return [] if self._stmt.whereclause is None else [self._stmt.whereclause]
+        # фильтры по отношениям: записи отбираются по первичному ключу из подзапроса с join-ами
+        pk = inspect(self._model).primary_key
+        subquery = self._stmt.with_only_columns(*pk, maintain_column_froms=True).order_by(None)
+        return [(pk[0] if len(pk) == 1 else tuple_(*pk)).in_(subquery)]
 
     # todo: methods
     #
@@ -182,10 +248,4 @@ class QuerySet:
     # async def earliest(self):
     #     pass
     #
-    # async def update(self):
-    #     pass
-    #
-    # async def delete(self):
-    #     pass
-    #
     # ...
@@ -0,0 +1,43 @@
+from typing import Any
+
+from sqlalchemy import select, literal, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+
+class EntityResolver:
+    """
+    Получает записи разных моделей по первичному ключу за один запрос, например, для проверки
+    существования всех внешних ключей из тела запроса.
+    Записи, уже загруженные в сессию, берутся из identity map без обращения к БД
+    """
+
+    def __init__(self, session: AsyncSession):
+        self._session = session
+
+    async def resolve(self, **lookups: tuple[Any, Any]) -> dict[str, Any]:
+        # lookups: widget=(Widget, 1), subsection=(Subsection, 2)
+        # результат: {"widget": Widget | None, "subsection": Subsection | None}
+        resolved, missing = {}, {}
+        for name, (model, pk_value) in lookups.items():
+            instance = None
+            if pk_value is not None:
+                instance = self._session.identity_map.get(self._session.identity_key(model, pk_value))
+            if instance is None and pk_value is not None:
+                missing[name] = (model, pk_value)
+            else:
+                resolved[name] = instance
+        if missing:
+            resolved.update(await self._load(missing))
+        return {name: resolved[name] for name in lookups}
+
+    async def _load(self, lookups: dict[str, tuple[Any, Any]]) -> dict[str, Any]:
+        # SELECT a.*, b.* FROM (SELECT 1) LEFT JOIN a ON a.id = :a LEFT JOIN b ON b.id = :b
+        # всегда возвращает одну строку, в которой не найденные записи будут None
+        entities = {name: aliased(model, name=name) for name, (model, _) in lookups.items()}
+        stmt = select(*entities.values()).select_from(select(literal(1)).subquery())
+        for name, (model, pk_value) in lookups.items():
+            pk_column = inspect(model).primary_key[0]
+            stmt = stmt.outerjoin(entities[name], getattr(entities[name], pk_column.key) == pk_value)
+        result = await self._session.execute(stmt)
+        return dict(zip(entities, result.one()))
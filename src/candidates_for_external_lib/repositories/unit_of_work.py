@@ -0,0 +1,45 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+UNIT_OF_WORK_DEPTH_KEY = "unit_of_work_depth"
+
+
+def in_unit_of_work(session: AsyncSession) -> bool:
+    return session.info.get(UNIT_OF_WORK_DEPTH_KEY, 0) > 0
+
+
+class UnitOfWork:
+    """
+    Группирует записи нескольких репозиториев в одну транзакцию.
+    Внутри блока репозитории только отправляют изменения в БД (flush), фиксация выполняется один раз при выходе:
+
+        async with unit_of_work:
+            section = await section_repository.create(...)
+            await subsection_repository.create(section=section, ...)
+
+    Вложенные блоки фиксирует самый внешний, для частичного отката используется savepoint()
+    """
+
+    def __init__(self, session: AsyncSession):
+        self._session = session
+
+    async def __aenter__(self) -> "UnitOfWork":
+        self._session.info[UNIT_OF_WORK_DEPTH_KEY] = self._session.info.get(UNIT_OF_WORK_DEPTH_KEY, 0) + 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self._session.info[UNIT_OF_WORK_DEPTH_KEY] -= 1
+        if in_unit_of_work(self._session):
+            return
+        if exc_type is None:
+            await self._session.commit()
+        else:
+            await self._session.rollback()
+
+    @asynccontextmanager
+    async def savepoint(self) -> AsyncIterator[None]:
+        # при исключении внутри блока откатываются только его изменения
+        async with self._session.begin_nested():
+            yield
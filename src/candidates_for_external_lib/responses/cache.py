@@ -0,0 +1,78 @@
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from candidates_for_external_lib.cache import LocalCache
+from candidates_for_external_lib.responses.json import dump_json
+
+
+class ResponseCache:
+    """
+    Кэш ответов GET-эндпоинтов с проверкой актуальности по ETag.
+    ETag вычисляется из водяных знаков данных, которые отдает эндпоинт (get_watermark_stmt) - версий таблиц
+    (см. candidates_for_external_lib.sqlalchemy.versions), одним запросом по первичному ключу.
+    Если клиент прислал тот же ETag в If-None-Match, отдается 304,
+    если в кэше есть ответ с тем же ETag - он отдается без повторных запросов и сериализации.
+    Сохраненные ответы сбрасываются после фиксации изменений (version_on_commit(model, cache_class.invalidate))
+
+        if response := await cache.get_response():
+            return response
+        ...
+        return cache.store(section, RetrieveSectionSchema)
+    """
+
+    responses: LocalCache = None  # общий для эндпоинтов, которые сбрасываются вместе
+
+    def __init__(self, request: Request, session: AsyncSession):
+        self._request = request
+        self._session = session
+        self._key = self._get_key(request)
+        self._etag = None
+
+    def get_watermark_stmt(self) -> Select:
+        raise NotImplementedError
+
+    @classmethod
+    def invalidate(cls) -> None:
+        # устаревший ответ и так не будет отдан из-за несовпадения ETag, сброс освобождает память
+        cls.responses.clear()
+
+    async def get_response(self) -> Response | None:
+        watermark = (await self._session.execute(self.get_watermark_stmt())).one()
+        digest = hashlib.sha1(f"{self._key}|{tuple(watermark)}".encode()).hexdigest()
+        self._etag = f'W/"{digest}"'
+        if self._etag_matches(self._request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=self._get_headers())
+        cached = self.responses.get(self._key)
+        if cached is not None and cached[0] == self._etag:
+            return self._get_response(cached[1])
+        return None
+
+    def store(self, content: Any, schema: Any) -> Response:
+        # сериализация сразу в байты: они же и сохраняются в кэш
+        body = dump_json(schema, content)
+        self.responses.set(self._key, (self._etag, body))
+        return self._get_response(body)
+
+    def _get_response(self, body: bytes) -> Response:
+        return Response(body, media_type="application/json", headers=self._get_headers())
+
+    def _get_headers(self) -> dict[str, str]:
+        # no-cache: клиент может хранить ответ, но перед использованием обязан проверить его по ETag
+        return {"ETag": self._etag, "Cache-Control": "no-cache"}
+
+    def _etag_matches(self, if_none_match: str | None) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        etag = self._etag.removeprefix("W/")
+        return any(value.strip().removeprefix("W/") == etag for value in if_none_match.split(","))
+
+    @staticmethod
+    def _get_key(request: Request) -> str:
+        # фильтры, сортировка и пагинация передаются в query-параметрах
+        return f"{request.url.path}?{sorted(request.query_params.multi_items())}"
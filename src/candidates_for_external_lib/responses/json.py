@@ -0,0 +1,39 @@
+from functools import lru_cache
+from typing import Any, Mapping
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from starlette.background import BackgroundTask
+
+
+@lru_cache(maxsize=256)
+def get_type_adapter(schema: Any) -> TypeAdapter:
+    # построение TypeAdapter дорогое, поэтому он создается один раз на схему
+    return TypeAdapter(schema)
+
+
+def dump_json(schema: Any, content: Any) -> bytes:
+    # валидация (в т.ч. из атрибутов ORM-объектов) и сериализация сразу в байты, минуя jsonable_encoder
+    adapter = get_type_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+class ModelResponse(Response):
+    """
+    Ответ, который схема сериализует сразу в байты, минуя валидацию response_model в fastapi,
+    jsonable_encoder и json.dumps. response_model в декораторе эндпоинта остается для документации
+
+        return ModelResponse(sections, PaginatedResponse[RetrieveSectionSchema])
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Any,
+        schema: Any,
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+        background: BackgroundTask | None = None,
+    ):
+        super().__init__(dump_json(schema, content), status_code=status_code, headers=headers, background=background)
@@ -8,3 +8,9 @@ Item = TypeVar("Item")
 class PaginatedResponse(BaseModel, Generic[Item]):
     count: int
     results: list[Item]
+
+
+class CursorPaginatedResponse(BaseModel, Generic[Item]):
+    next: str | None
+    previous: str | None
+    results: list[Item]
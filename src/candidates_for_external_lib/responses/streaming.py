@@ -0,0 +1,74 @@
+import csv
+import io
+from enum import StrEnum
+from typing import Any, AsyncIterable, AsyncIterator
+
+import orjson
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from candidates_for_external_lib.responses.json import get_type_adapter
+
+BATCH_SIZE = 500  # записей в одном фрагменте ответа
+
+
+class ExportFormat(StrEnum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+async def iter_ndjson(entries: AsyncIterable, schema: type[BaseModel], batch_size: int = BATCH_SIZE) -> AsyncIterator[bytes]:
+    # одна запись - одна строка json
+    adapter = get_type_adapter(schema)
+    batch = []
+    async for entry in entries:
+        batch.append(adapter.dump_json(adapter.validate_python(entry, from_attributes=True)))
+        if len(batch) >= batch_size:
+            yield b"\n".join(batch) + b"\n"
+            batch.clear()
+    if batch:
+        yield b"\n".join(batch) + b"\n"
+
+
+async def iter_csv(entries: AsyncIterable, schema: type[BaseModel], batch_size: int = BATCH_SIZE) -> AsyncIterator[bytes]:
+    # заголовок - поля схемы, вложенные объекты и списки записываются в ячейку как json
+    adapter = get_type_adapter(schema)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(schema.model_fields)
+    count = 0
+    async for entry in entries:
+        row = adapter.dump_python(adapter.validate_python(entry, from_attributes=True), mode="json")
+        writer.writerow(_to_csv_value(value) for value in row.values())
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _to_csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return orjson.dumps(value).decode()
+    return value
+
+
+class ExportResponse(StreamingResponse):
+    """
+    Выгрузка записей файлом NDJSON или CSV: записи сериализуются и отправляются по мере получения,
+    поэтому память не зависит от объема выгрузки
+
+        return ExportResponse(queryset.stream(), RetrieveArticleContentSchema, ExportFormat.csv, "article_content")
+    """
+
+    media_types = {ExportFormat.ndjson: "application/x-ndjson", ExportFormat.csv: "text/csv; charset=utf-8"}
+    iterators = {ExportFormat.ndjson: iter_ndjson, ExportFormat.csv: iter_csv}
+
+    def __init__(self, entries: AsyncIterable, schema: type[BaseModel], export_format: ExportFormat, filename: str):
+        super().__init__(
+            self.iterators[export_format](entries, schema),
+            media_type=self.media_types[export_format],
+            headers={"content-disposition": f'attachment; filename="{filename}.{export_format}"'},
+        )
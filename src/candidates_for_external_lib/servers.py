@@ -0,0 +1,21 @@
+import random
+
+import uvicorn
+
+
+class JitteredServer(uvicorn.Server):
+    """
+    Сервер uvicorn, ограничение количества запросов которого (limit_max_requests) увеличено
+    на случайное число до limit_max_requests_jitter: воркеры, запущенные одновременно, не перезапускаются одновременно.
+    Число выбирается при запуске, то есть уже в процессе воркера: экземпляр сервера копируется в каждый воркер.
+    Класс должен быть импортируемым из модуля (не из __main__), чтобы воркеры могли его распаковать
+    """
+
+    def __init__(self, config: uvicorn.Config, limit_max_requests_jitter: int = 0):
+        super().__init__(config)
+        self.limit_max_requests_jitter = limit_max_requests_jitter
+
+    async def startup(self, sockets=None) -> None:
+        if self.config.limit_max_requests is not None and self.limit_max_requests_jitter:
+            self.config.limit_max_requests += random.randint(0, self.limit_max_requests_jitter)
+        await super().startup(sockets=sockets)
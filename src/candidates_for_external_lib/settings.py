@@ -1,20 +1,89 @@
+import math
+import os
+from enum import StrEnum
+from pathlib import Path
 from typing import Any
+from uuid import uuid4
 
 import orjson
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator
 from sqlalchemy import URL
 
+from candidates_for_external_lib.sqlalchemy.pool import InstrumentedAsyncAdaptedQueuePool
+
 NON_SET = object()
 
+CGROUP_V2_CPU_MAX = Path("/sys/fs/cgroup/cpu.max")
+CGROUP_V1_CPU_QUOTA = Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+CGROUP_V1_CPU_PERIOD = Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+
+
+def get_cpu_quota() -> float | None:
+    # ограничение CPU контейнера (docker --cpus, limits.cpu в kubernetes) - квота времени на период планировщика.
+    # None - ограничения нет или cgroup недоступна
+    try:
+        quota, period = CGROUP_V2_CPU_MAX.read_text().split()
+    except (OSError, ValueError):
+        try:
+            quota, period = CGROUP_V1_CPU_QUOTA.read_text().strip(), CGROUP_V1_CPU_PERIOD.read_text().strip()
+        except OSError:
+            return None
+    if quota in ("max", "-1"):
+        return None
+    return int(quota) / int(period)
+
+
+class UvicornMode(StrEnum):
+    development = "development"  # один процесс с перезагрузкой при изменении кода
+    production = "production"  # воркеры без перезагрузки, параметры ниже
+
 
 class UvicornSettings(BaseModel):
+    mode: UvicornMode = UvicornMode.development
     host: str = "localhost"
     port: int = 8000
     log_level: str = "info"
-    reload: bool = True
-    workers: int = 1
+    reload: bool = True  # только в режиме development
+    # None - по количеству доступных процессу CPU с учетом квоты cgroup (в режиме development - 1)
+    workers: int | None = None
+    # реализации цикла событий и HTTP-парсера (зависимости uvloop, httptools); без них используются стандартные
+    loop: str = "uvloop"
+    http: str = "httptools"
+    backlog: int = 2048  # очередь входящих соединений сокета
+    timeout_keep_alive: int = 5  # сек; должен быть больше таймаута простоя балансировщика перед приложением
+    # ответ 503 при большем количестве одновременных соединений и задач на воркер
+    limit_concurrency: int | None = None
+    # перезапуск воркера после стольких запросов (плюс случайное число до limit_max_requests_jitter),
+    # чтобы воркеры не перезапускались одновременно
     limit_max_requests: int | None = None
-    # todo: оставшиеся параметры?
+    limit_max_requests_jitter: int = 0
+    timeout_graceful_shutdown: int | None = 30  # ожидание завершения запросов при остановке воркера, сек
+
+    @property
+    def worker_count(self) -> int:
+        if self.workers is not None:
+            return self.workers
+        if self.mode == UvicornMode.development:
+            return 1
+        # учитывается привязка процесса к CPU (taskset, cpuset контейнера), а не все CPU хоста
+        if hasattr(os, "sched_getaffinity"):
+            cpu_count = len(os.sched_getaffinity(0))
+        else:
+            cpu_count = os.cpu_count() or 1
+        # и квота CPU контейнера: при --cpus=2 на 32-ядерном хосте лишние воркеры только вытесняют друг друга
+        cpu_quota = get_cpu_quota()
+        if cpu_quota is not None:
+            cpu_count = min(cpu_count, max(1, math.ceil(cpu_quota)))
+        return cpu_count
+
+
+class ReplicaSettings(BaseModel):
+    # не заданные параметры берутся у основной БД
+    host: str
+    port: int | None = None
+    username: str | None = None
+    password: str | None = None
+    database: str | None = None
 
 
 class DatabaseSettings(BaseModel):
@@ -23,7 +92,28 @@ class DatabaseSettings(BaseModel):
     username: str
     password: str
     database: str
-    options: dict | None = None  # todo: может kwargs
+    options: dict | None = Field(default=None, validate_default=True)  # todo: может kwargs
+    # пул соединений на процесс (воркер uvicorn): всего до (pool_size + max_overflow) * workers соединений
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30  # ожидание свободного соединения, сек
+    pool_recycle: int = 1800  # переоткрытие соединений старше, сек; -1 - без ограничения
+    pool_pre_ping: bool = False  # проверка соединения запросом перед выдачей из пула
+    pool_name: str = "primary"  # имя пула в логах и метриках
+    # кэши подготовленных выражений asyncpg и sqlalchemy на соединение
+    statement_cache_size: int = 100
+    prepared_statement_cache_size: int = 100
+    # PgBouncer в режиме transaction/statement: подготовленные выражения отключаются,
+    # тк следующий запрос может уйти в другое серверное соединение
+    pgbouncer: bool = False
+    application_name: str | None = None
+    # реплики для чтения: MY_PROJECT__DB__REPLICAS='[{"host": "replica-1"}, {"host": "replica-2"}]'
+    replicas: list[ReplicaSettings] = []
+    replica_retry_after: float = 30  # время исключения реплики после ошибки подключения, сек
+    replica_check_interval: float = 10  # период фоновой проверки реплик, сек
+    # пороги записи HTTP-запроса в журнал по статистике SQL-запросов; None - без проверки
+    slow_request_queries: int | None = 30
+    slow_request_duration: float | None = 0.5  # суммарное время в БД, сек
 
     @field_validator("options", mode="after")  # noqa
     @classmethod
@@ -33,14 +123,39 @@ class DatabaseSettings(BaseModel):
             options["connect_args"] = {}
         if "server_settings" not in options["connect_args"]:
             options["connect_args"]["server_settings"] = {}
-        # todo:
-        #  обработать получение application_name из энвов, учитывая, что DatabaseSettings будет во внешней либе
-        #  p.s. или наверно пусть будет возможность в определить в настройках DatabaseSettings
-        # options["connect_args"]["server_settings"]["application_name"] = PROJECT_NAME
         options["json_serializer"] = lambda obj: orjson.dumps(obj).decode()
         options["json_deserializer"] = orjson.loads
         return options
 
+    @property
+    def engine_options(self) -> dict[str, Any]:
+        # параметры create_async_engine; значения из options имеют приоритет
+        options = {
+            "poolclass": InstrumentedAsyncAdaptedQueuePool,
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.pool_timeout,
+            "pool_recycle": self.pool_recycle,
+            "pool_pre_ping": self.pool_pre_ping,
+            "pool_logging_name": self.pool_name,
+            **self.options,
+        }
+        connect_args = dict(options["connect_args"])
+        server_settings = dict(connect_args["server_settings"])
+        if self.application_name:
+            server_settings.setdefault("application_name", self.application_name)
+        connect_args["server_settings"] = server_settings
+        if self.pgbouncer:
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+            # безымянные выражения asyncpg все равно создаются на сервере: имена должны быть уникальными
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+        else:
+            connect_args.setdefault("statement_cache_size", self.statement_cache_size)
+            connect_args.setdefault("prepared_statement_cache_size", self.prepared_statement_cache_size)
+        options["connect_args"] = connect_args
+        return options
+
     @property
     def dsn(self):
         return URL.create(
@@ -52,6 +167,19 @@ class DatabaseSettings(BaseModel):
             database=self.database,
         )
 
+    @property
+    def replica_dsns(self) -> list[URL]:
+        return [
+            self.dsn.set(
+                host=replica.host,
+                port=replica.port or self.port,
+                username=replica.username or self.username,
+                password=replica.password or self.password,
+                database=replica.database or self.database,
+            )
+            for replica in self.replicas
+        ]
+
 
 class ApiSettings(BaseModel):
     root: str = "/api"
@@ -65,3 +193,11 @@ class RedisBrokerSettings(BaseModel):
     # todo:
     #  другие настройки для faststream.redis.RedisBroker
     #
+
+
+class CacheSettings(BaseModel):
+    ttl: int = 60  # время жизни записей в памяти процесса, сек
+    maxsize: int = 1024  # количество записей в памяти процесса на один кэш
+    redis_enabled: bool = False  # второй уровень кэша в Redis, общий для всех процессов
+    redis_ttl: int = 300
+    key_prefix: str = "cache"
@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+import orjson
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+
+@dataclass(frozen=True, slots=True)
+class SeqScan:
+    relation: str
+    rows: int  # строк в таблице по статистике (pg_class.reltuples)
+    filter: str | None
+    statement: str
+
+
+class QueryAdvisor:
+    """
+    Проверка планов запросов на локальной БД с данными: SELECT-ы, выполненные внутри блока,
+    после выхода повторяются с EXPLAIN, последовательное чтение таблиц больше min_rows строк попадает в seq_scans
+
+        async with QueryAdvisor(engine, min_rows=1000) as advisor:
+            await client.get("/api/section")
+        advisor.assert_no_seq_scans()
+
+    Планировщик выбирает seq scan для маленьких таблиц, поэтому проверка имеет смысл на объемах, близких к боевым,
+    и после ANALYZE. Агрегаты по всей таблице без фильтра (точный count(*) для пагинации) читают ее целиком
+    при любых индексах и не считаются ошибкой
+    """
+
+    def __init__(self, engine: AsyncEngine, min_rows: int = 1000):
+        self._engine = engine
+        self._min_rows = min_rows
+        self._statements: dict[tuple[str, Any], None] = {}
+        self.seq_scans: list[SeqScan] = []
+
+    async def __aenter__(self) -> "QueryAdvisor":
+        event.listen(self._engine.sync_engine, "before_cursor_execute", self._collect)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        event.remove(self._engine.sync_engine, "before_cursor_execute", self._collect)
+        if exc_info[0] is None:
+            self.seq_scans = await self.explain()
+
+    def assert_no_seq_scans(self) -> None:
+        if self.seq_scans:
+            details = "\n".join(
+                f"{scan.relation} ({scan.rows} строк, фильтр: {scan.filter}): {scan.statement}" for scan in self.seq_scans
+            )
+            raise AssertionError(f"Последовательное чтение больших таблиц:\n{details}")
+
+    async def explain(self) -> list[SeqScan]:
+        seq_scans = []
+        async with self._engine.connect() as connection:
+            for statement, parameters in self._statements:
+                result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                explained = result.scalar()
+                # asyncpg декодирует json сам, другие драйверы возвращают строку
+                if isinstance(explained, (str, bytes)):
+                    explained = orjson.loads(explained)
+                plan = explained[0]["Plan"]
+                for node, parent in self._iter_nodes(plan):
+                    if node["Node Type"] != "Seq Scan":
+                        continue
+                    if parent is not None and parent["Node Type"] == "Aggregate" and "Filter" not in node:
+                        continue
+                    rows = await self._get_table_rows(connection, node["Relation Name"], node.get("Schema"))
+                    if rows > self._min_rows:
+                        seq_scans.append(SeqScan(node["Relation Name"], rows, node.get("Filter"), statement))
+        return seq_scans
+
+    def _collect(self, connection, cursor, statement: str, parameters, context, executemany: bool) -> None:
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            self._statements.setdefault((statement, tuple(parameters or ())), None)
+
+    @classmethod
+    def _iter_nodes(cls, node: dict, parent: dict | None = None) -> Iterator[tuple[dict, dict | None]]:
+        yield node, parent
+        for child in node.get("Plans", ()):
+            yield from cls._iter_nodes(child, node)
+
+    @staticmethod
+    async def _get_table_rows(connection: AsyncConnection, relation: str, schema: str | None) -> int:
+        stmt = text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:name AS regclass)")
+        name = f'"{schema}"."{relation}"' if schema else f'"{relation}"'
+        return await connection.scalar(stmt, {"name": name}) or 0
@@ -0,0 +1,45 @@
+"""
+Отметка моделей, записи которых изменила текущая транзакция сессии: через репозиторий, добавление в сессию,
+массовые INSERT/UPDATE/DELETE или в обход ORM (COPY, см. mark_changed).
+На отметки опираются сброс кэшей после фиксации (invalidate_on_commit) и версии таблиц (version_on_commit)
+"""
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session, object_session
+
+CHANGED_MODELS_KEY = "changed_models"
+
+_tracked_models: set[Any] = set()
+
+
+def track_changes(model) -> None:
+    if model in _tracked_models:
+        return
+    _tracked_models.add(model)
+    for identifier in ("after_insert", "after_update", "after_delete"):
+        event.listen(model, identifier, lambda mapper, connection, target: mark_changed(object_session(target), model))
+
+
+def mark_changed(session: Session | None, model) -> None:
+    # для записи в обход событий ORM (COPY) отметка ставится явно
+    if session is not None and model in _tracked_models:
+        session.info.setdefault(CHANGED_MODELS_KEY, set()).add(model)
+
+
+def get_changed_models(session: Session) -> set[Any]:
+    return session.info.get(CHANGED_MODELS_KEY, set())
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_changed_by_statement(state: ORMExecuteState) -> None:
+    if (state.is_insert or state.is_update or state.is_delete) and state.bind_mapper is not None:
+        mark_changed(state.session, state.bind_mapper.class_)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_changed_models(session: Session, transaction) -> None:
+    # внешняя транзакция завершилась: фиксацией (after_commit уже отработал) или откатом.
+    # откат savepoint отметки не снимает: лишний сброс кэша безопаснее пропущенного
+    if transaction.parent is None:
+        session.info.pop(CHANGED_MODELS_KEY, None)
@@ -3,20 +3,20 @@ from datetime import datetime
 from sqlalchemy import TIMESTAMP, func
 from sqlalchemy.orm import declarative_mixin, Mapped, mapped_column
 
-from candidates_for_external_lib.utils.time import utcnow
-
 
 @declarative_mixin
 class TimestampzMixin:
+    # время берется из часов СУБД, а не процесса приложения: расхождение часов между экземплярами приложения
+    # не должно путать порядок записей
     created_at: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True),
-        default=utcnow,  # будет подставлено при insert
-        server_default=func.now(),
+        server_default=func.now(),  # будет подставлено при insert
         comment="Дата и время создания записи",
     )
-    # на стороне СУБД вроде нет возможности обновлять поле при обновлении записи, поэтому без server_onupdate
+    # на стороне СУБД вроде нет возможности обновлять поле при обновлении записи без триггера,
+    # поэтому now() подставляется в UPDATE (и в ON CONFLICT DO UPDATE, см. BaseRepository.upsert)
     updated_at: Mapped[datetime | None] = mapped_column(
         TIMESTAMP(timezone=True),
-        onupdate=utcnow,  # будет подставлено при update
+        onupdate=func.now(),  # будет подставлено при update
         comment="Дата и время обновления записи",
     )
@@ -0,0 +1,16 @@
+from sqlalchemy import BigInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from candidates_for_external_lib.sqlalchemy.models.base import Base
+
+
+class TableVersion(Base):
+    """
+    Версия данных таблицы, см. version_on_commit
+    """
+
+    __tablename__ = "table_version"
+    __repr_attrs__ = ("name", "version")
+
+    name: Mapped[str] = mapped_column(String(255), primary_key=True, comment="Имя таблицы")
+    version: Mapped[int] = mapped_column(BigInteger, comment="Номер последней зафиксированной версии")
@@ -0,0 +1,37 @@
+import time
+
+from prometheus_client import Gauge, Histogram
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+
+# имя пула в метриках - pool_logging_name движка
+POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Время получения соединения из пула, включая ожидание свободного соединения и подключение",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+POOL_SIZE = Gauge("db_pool_size", "Размер пула соединений", ["pool"])
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Выданные из пула соединения", ["pool"])
+POOL_CHECKED_IN = Gauge("db_pool_checked_in", "Свободные соединения в пуле", ["pool"])
+POOL_OVERFLOW = Gauge("db_pool_overflow", "Соединения, открытые сверх размера пула", ["pool"])
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    # пул по умолчанию для create_async_engine, дополнительно замеряющий время выдачи соединения
+
+    def connect(self) -> PoolProxiedConnection:
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            POOL_CHECKOUT_SECONDS.labels(self.logging_name or "default").observe(time.perf_counter() - started)
+
+
+def observe_pool(engine: AsyncEngine, name: str = "default") -> None:
+    # значения читаются при сборе метрик; через engine, тк engine.dispose() пересоздает пул
+    POOL_SIZE.labels(name).set_function(lambda: engine.pool.size())
+    POOL_CHECKED_OUT.labels(name).set_function(lambda: engine.pool.checkedout())
+    POOL_CHECKED_IN.labels(name).set_function(lambda: engine.pool.checkedin())
+    # до заполнения пула overflow() отрицательный: pool_size минус созданные соединения
+    POOL_OVERFLOW.labels(name).set_function(lambda: max(engine.pool.overflow(), 0))
@@ -0,0 +1,176 @@
+import asyncio
+import itertools
+import logging
+from functools import lru_cache, partial
+from time import monotonic
+from typing import Any
+
+from prometheus_client import Gauge
+from sqlalchemy import Engine, event, text
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+from candidates_for_external_lib.repositories.unit_of_work import in_unit_of_work
+
+logger = logging.getLogger(__name__)
+
+# флаг в session.info: все запросы сессии идут в основную БД (запись, чтение своих изменений)
+USE_PRIMARY_KEY = "use_primary"
+# execution_options(use_primary=True) для отдельного запроса
+USE_PRIMARY_OPTION = "use_primary"
+# флаг в session.info: сессия только читает, запросы выполняются в режиме autocommit без BEGIN/COMMIT
+READ_ONLY_KEY = "read_only"
+# реплика, выбранная сессией при первом чтении
+REPLICA_KEY = "replica"
+
+REPLICA_HEALTHY = Gauge("db_replica_healthy", "Доступность реплики для чтения", ["pool"])
+
+
+class ReplicaSet:
+    """
+    Реплики для чтения, выбираемые по кругу.
+    Реплика, на которой произошла ошибка подключения, исключается на retry_after секунд
+    или до успешной проверки run_health_checks
+    """
+
+    def __init__(self, engines: list[AsyncEngine], retry_after: float = 30):
+        self.engines = engines
+        self._retry_after = retry_after
+        self._unhealthy_until: dict[Engine, float] = {}
+        self._counter = itertools.count()
+        for engine in engines:
+            event.listen(engine.sync_engine, "do_connect", self._get_connect(engine.sync_engine))
+            event.listen(engine.sync_engine, "handle_error", partial(self._on_error, engine.sync_engine))
+            REPLICA_HEALTHY.labels(self._get_name(engine.sync_engine)).set_function(
+                lambda sync_engine=engine.sync_engine: self.is_healthy(sync_engine)
+            )
+
+    def get(self) -> Engine | None:
+        # None - нет доступных реплик
+        if not self.engines:
+            return None
+        start = next(self._counter)
+        for index in range(len(self.engines)):
+            engine = self.engines[(start + index) % len(self.engines)].sync_engine
+            if self.is_healthy(engine):
+                return engine
+        return None
+
+    def is_healthy(self, engine: Engine) -> bool:
+        return self._unhealthy_until.get(engine, 0) <= monotonic()
+
+    async def check(self, timeout: float = 5) -> None:
+        for engine in self.engines:
+            try:
+                async with asyncio.timeout(timeout):
+                    async with engine.connect() as connection:
+                        await connection.execute(text("SELECT 1"))
+            except Exception:  # noqa
+                if self.is_healthy(engine.sync_engine):
+                    self._mark_unhealthy(engine.sync_engine)
+            else:
+                self._unhealthy_until.pop(engine.sync_engine, None)
+
+    async def run_health_checks(self, interval: float) -> None:
+        # фоновая задача приложения: возвращает реплики в работу, не дожидаясь retry_after
+        while True:
+            await self.check()
+            await asyncio.sleep(interval)
+
+    def _get_connect(self, engine: Engine):
+        # ошибки подключения драйвера (например, ConnectionRefusedError) не доходят до handle_error,
+        # поэтому подключение выполняется здесь же
+        def connect(dialect, connection_record, cargs, cparams):
+            try:
+                return dialect.connect(*cargs, **cparams)
+            except Exception:
+                self._mark_unhealthy(engine)
+                raise
+
+        return connect
+
+    def _on_error(self, engine: Engine, context: ExceptionContext) -> None:
+        # разрыв соединения во время запроса, но не ошибки самих запросов.
+        # context.engine может быть представлением движка (get_autocommit_engine), поэтому движок из замыкания
+        if context.is_disconnect:
+            self._mark_unhealthy(engine)
+
+    def _mark_unhealthy(self, engine: Engine) -> None:
+        logger.warning("Реплика %s исключена на %s сек", self._get_name(engine), self._retry_after)
+        self._unhealthy_until[engine] = monotonic() + self._retry_after
+
+    @staticmethod
+    def _get_name(engine: Engine) -> str:
+        return engine.pool.logging_name or str(engine.url.host)
+
+
+@lru_cache(maxsize=32)
+def get_autocommit_engine(engine: Engine) -> Engine:
+    # представление движка с общим пулом: соединение переводится в autocommit при выдаче и возвращается обратно
+    return engine.execution_options(isolation_level="AUTOCOMMIT")
+
+
+class RoutingSession(Session):
+    """
+    Сессия, отправляющая чтение в реплики, а запись в основную БД (bind сессии):
+
+        async_sessionmaker(bind=engine, sync_session_class=RoutingSession, replicas=ReplicaSet(replica_engines))
+
+    В основную БД идут flush, INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE, запросы внутри UnitOfWork,
+    запросы с execution_options(use_primary=True), а также все запросы сессии после первой записи
+    или при session.info[USE_PRIMARY_KEY] = True, чтобы читать свои изменения.
+    Реплика выбирается один раз на сессию: все чтения сессии видят одно и то же отставание
+    и занимают соединение только одного пула. Если реплика исключена, сессия переходит на основную БД
+    При session.info[READ_ONLY_KEY] = True запросы выполняются вне транзакции: без BEGIN и COMMIT/ROLLBACK
+    """
+
+    def __init__(self, *args: Any, replicas: ReplicaSet | None = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs: Any):
+        bind = self._route(mapper, clause, **kwargs)
+        if self.info.get(READ_ONLY_KEY) and isinstance(bind, Engine) and not self._is_streaming(clause):
+            return get_autocommit_engine(bind)
+        return bind
+
+    def _route(self, mapper, clause, **kwargs: Any):
+        if self._is_write(clause):
+            # после записи сессия читает из основной БД, чтобы видеть свои изменения
+            self.info[USE_PRIMARY_KEY] = True
+        elif self.replicas is not None and self._can_use_replica(clause):
+            replica = self._get_replica()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+    def _get_replica(self) -> Engine | None:
+        replica = self.info.get(REPLICA_KEY)
+        if replica is None:
+            replica = self.info[REPLICA_KEY] = self.replicas.get()
+        if replica is None or not self.replicas.is_healthy(replica):
+            # нет доступных реплик или выбранная исключена: дальше сессия читает из основной БД
+            self.info[USE_PRIMARY_KEY] = True
+            return None
+        return replica
+
+    @staticmethod
+    def _is_streaming(clause) -> bool:
+        # серверный курсор asyncpg работает только внутри транзакции
+        options = getattr(clause, "_execution_options", {})
+        return bool(options.get("yield_per") or options.get("stream_results"))
+
+    def _is_write(self, clause) -> bool:
+        # clause is None - соединение для flush или явный session.connection(), text() - неизвестно что
+        if self._flushing or clause is None:
+            return True
+        return not getattr(clause, "is_select", False) or getattr(clause, "_for_update_arg", None) is not None
+
+    def _can_use_replica(self, clause) -> bool:
+        # внутри UnitOfWork чтение идет в той же транзакции, что и запись
+        return not (
+            self.info.get(USE_PRIMARY_KEY)
+            or in_unit_of_work(self)
+            or clause._execution_options.get(USE_PRIMARY_OPTION, False)
+        )
@@ -0,0 +1,134 @@
+"""
+Статистика SQL-запросов в пределах блока кода (HTTP-запроса, задачи, теста):
+количество выражений, суммарное время в БД и самое долгое выражение.
+Запросы считаются событиями движка, поэтому в статистику попадают и selectinload, и autoflush, и commit
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+from prometheus_client import Histogram
+from prometheus_fastapi_instrumentator.metrics import Info
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+STARTED_KEY = "query_stats_started"
+STATE_KEY = "query_stats"
+
+REQUEST_QUERIES = Histogram(
+    "db_request_queries",
+    "Количество SQL-запросов за HTTP-запрос",
+    ["handler", "method"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "db_request_duration_seconds",
+    "Суммарное время SQL-запросов за HTTP-запрос",
+    ["handler", "method"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_SLOWEST_QUERY_SECONDS = Histogram(
+    "db_request_slowest_query_seconds",
+    "Время самого долгого SQL-запроса за HTTP-запрос",
+    ["handler", "method"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+@dataclass(slots=True)
+class QueryStats:
+    parent: "QueryStats | None" = None
+    count: int = 0
+    duration: float = 0  # сек
+    slowest_duration: float = 0
+    slowest_statement: str | None = None
+    statements: list[str] = field(default_factory=list)
+
+    def add(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements.append(statement)
+        if duration > self.slowest_duration:
+            self.slowest_duration = duration
+            self.slowest_statement = statement
+        # вложенные блоки (запрос приложения внутри assert_num_queries в тесте) учитываются и во внешнем
+        if self.parent is not None:
+            self.parent.add(statement, duration)
+
+
+# синхронный код sqlalchemy выполняется в гринлете с контекстом вызывающей корутины,
+# поэтому значение видно в событиях движка
+query_stats_var: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def query_stats() -> Iterator[QueryStats]:
+    stats = QueryStats(parent=query_stats_var.get())
+    token = query_stats_var.set(stats)
+    try:
+        yield stats
+    finally:
+        query_stats_var.reset(token)
+
+
+@contextmanager
+def assert_num_queries(expected: int) -> Iterator[QueryStats]:
+    """
+    Фиксация количества SQL-запросов в тестах:
+
+        with assert_num_queries(3):
+            await client.put(f"/api/section/{section_id}", json=data)
+    """
+    with query_stats() as stats:
+        yield stats
+    if stats.count != expected:
+        statements = "\n".join(f"{number}. {statement}" for number, statement in enumerate(stats.statements, start=1))
+        raise AssertionError(f"Ожидалось SQL-запросов: {expected}, выполнено: {stats.count}\n{statements}")
+
+
+def query_stats_metrics() -> Callable[[Info], None]:
+    # инструментация для PrometheusFastApiInstrumentator.add; статистику в request.state кладет QueryStatsMiddleware
+    def instrumentation(info: Info) -> None:
+        stats = getattr(info.request.state, STATE_KEY, None)
+        if stats is None:
+            return
+        labels = (info.modified_handler, info.method)
+        REQUEST_QUERIES.labels(*labels).observe(stats.count)
+        REQUEST_DB_SECONDS.labels(*labels).observe(stats.duration)
+        if stats.count:
+            REQUEST_SLOWEST_QUERY_SECONDS.labels(*labels).observe(stats.slowest_duration)
+
+    return instrumentation
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    # время выражения без ожидания соединения из пула (см. db_pool_checkout_seconds)
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
+
+def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany) -> None:
+    if query_stats_var.get() is not None:
+        connection.info.setdefault(STARTED_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany) -> None:
+    _add(connection, statement)
+
+
+def _handle_error(exception_context) -> None:
+    # выражение с ошибкой тоже выполнялось в БД
+    if exception_context.connection is not None and exception_context.statement is not None:
+        _add(exception_context.connection, exception_context.statement)
+
+
+def _add(connection, statement: str) -> None:
+    started = connection.info.get(STARTED_KEY)
+    if not started:
+        return
+    duration = time.perf_counter() - started.pop()
+    if (stats := query_stats_var.get()) is not None:
+        stats.add(statement, duration)
@@ -0,0 +1,61 @@
+"""
+Версии данных таблиц, возрастающие в порядке фиксации транзакций.
+
+Отметки времени (updated_at = now()) для проверки актуальности кэша не подходят: now() - время начала транзакции,
+и транзакция, начатая раньше, но зафиксированная позже, запишет отметку не больше уже прочитанного максимума.
+Версия таблицы увеличивается в изменившей ее транзакции непосредственно перед фиксацией, а строка версии остается
+заблокированной до COMMIT: следующая транзакция, изменившая ту же таблицу, увеличит версию только после нее.
+Версия видна другим сессиям (и процессам) вместе с изменениями
+
+    version_on_commit(Section, SectionResponseCache.invalidate)
+    ...
+    select(*get_versions(Section, Subsection))
+"""
+from typing import Any, Callable
+
+from sqlalchemy import ScalarSelect, event, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from candidates_for_external_lib.sqlalchemy.changes import get_changed_models, track_changes
+from candidates_for_external_lib.sqlalchemy.models.versions import TableVersion
+
+# модели с версией и функции, вызываемые после фиксации их изменений (сброс локальных кэшей)
+_versioned_models: dict[Any, list[Callable[[], None]]] = {}
+
+
+def version_on_commit(model, *on_commit: Callable[[], None]) -> None:
+    _versioned_models.setdefault(model, []).extend(on_commit)
+    track_changes(model)
+
+
+def get_versions(*models) -> list[ScalarSelect]:
+    # NULL - таблица еще не изменялась
+    return [
+        select(TableVersion.version).where(TableVersion.name == model.__tablename__).scalar_subquery()
+        for model in models
+    ]
+
+
+@event.listens_for(Session, "before_commit")
+def _increment_versions(session: Session) -> None:
+    if session.in_nested_transaction():
+        return
+    # изменения, которые еще не отправлены в БД, отправляются здесь, чтобы попасть в отметки
+    session.flush()
+    names = sorted({model.__tablename__ for model in get_changed_models(session) if model in _versioned_models})
+    if not names:
+        return
+    # строки версий блокируются в одном порядке, чтобы параллельные транзакции не ждали друг друга по кругу
+    stmt = pg_insert(TableVersion).values([{"name": name, "version": 1} for name in names])
+    stmt = stmt.on_conflict_do_update(index_elements=[TableVersion.name], set_={"version": TableVersion.version + 1})
+    session.execute(stmt)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_on_commit(session: Session) -> None:
+    callbacks = {
+        callback for model in get_changed_models(session) for callback in _versioned_models.get(model, ())
+    }
+    for callback in callbacks:
+        callback()
@@ -0,0 +1,12 @@
+from typing import Any, Sequence
+
+
+def set_by_path(target: dict, path: Sequence[str], value: Any) -> None:
+    # {"a": {"b": value}} по пути ["a", "b"], промежуточные словари создаются;
+    # если на пути уже лежит значение, а не словарь, сохраняется оно
+    *parents, key = path or ("",)
+    for parent in parents:
+        target = target.setdefault(parent, {})
+        if not isinstance(target, dict):
+            return
+    target.setdefault(key, value)
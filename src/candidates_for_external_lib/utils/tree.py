@@ -0,0 +1,20 @@
+from typing import Any, Iterable
+
+
+def build_tree(
+    rows: Iterable[dict[str, Any]], id_key: str = "id", parent_key: str = "parent_id", children_key: str = "children"
+) -> list[dict[str, Any]]:
+    # за один проход: строки должны идти от родителей к детям (например, по глубине),
+    # порядок детей у узла сохраняется. строки с неизвестным родителем пропускаются
+    nodes, roots = {}, []
+    for row in rows:
+        node = {**row, children_key: []}
+        parent_id = row[parent_key]
+        if parent_id is None:
+            roots.append(node)
+        elif (parent := nodes.get(parent_id)) is not None:
+            parent[children_key].append(node)
+        else:
+            continue
+        nodes[row[id_key]] = node
+    return roots
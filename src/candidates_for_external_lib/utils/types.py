@@ -0,0 +1,14 @@
+from datetime import date, datetime
+from typing import Any
+
+
+def to_python_value(column, value: Any) -> Any:
+    # приводит значение, прошедшее через json (курсор, кэш), к python-типу колонки
+    if value is None:
+        return value
+    python_type = column.type.python_type
+    if isinstance(value, python_type):
+        return value
+    if python_type in (datetime, date):
+        return python_type.fromisoformat(value)
+    return python_type(value)
@@ -9,7 +9,8 @@ from dotenv import load_dotenv
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from candidates_for_external_lib.settings import DatabaseSettings, UvicornSettings, ApiSettings, RedisBrokerSettings
+from candidates_for_external_lib.settings import DatabaseSettings, UvicornSettings, ApiSettings, RedisBrokerSettings, \
+    CacheSettings
 from shared.constants import EnvironmentEnum
 
 ENVIRONMENT = EnvironmentEnum.get_environment()
@@ -26,6 +27,7 @@ class Settings(BaseSettings):
     db: DatabaseSettings = Field(default_factory=DatabaseSettings)
     api: ApiSettings = Field(default_factory=ApiSettings)
     redis_broker: RedisBrokerSettings = Field(default_factory=RedisBrokerSettings)  # можно как то уточнить, что это faststream
+    cache: CacheSettings = Field(default_factory=CacheSettings)
     sentry_dsn: str | None = None
 
     model_config = SettingsConfigDict(env_prefix="MY_PROJECT__", env_nested_delimiter="__")
@@ -33,15 +35,25 @@ class Settings(BaseSettings):
     #   MY_PROJECT__UVICORN__APP=web.app:get_app
     #   MY_PROJECT__UVICORN__HOST=localhost
     #   MY_PROJECT__UVICORN__PORT=8000
+    #   MY_PROJECT__UVICORN__MODE=production
+    #   MY_PROJECT__UVICORN__LIMIT_MAX_REQUESTS=10000
+    #   MY_PROJECT__UVICORN__LIMIT_MAX_REQUESTS_JITTER=1000
     #   MY_PROJECT__DB__HOST=localhost
     #   MY_PROJECT__DB__PORT=5433
     #   MY_PROJECT__DB__USERNAME=postgres
     #   MY_PROJECT__DB__PASSWORD=postgres
     #   MY_PROJECT__DB__DATABASE=project-structure
     #   MY_PROJECT__DB__OPTIONS={"echo": true}
+    #   MY_PROJECT__DB__POOL_SIZE=5
+    #   MY_PROJECT__DB__PGBOUNCER=false
+    #   MY_PROJECT__DB__APPLICATION_NAME=my-project
+    #   MY_PROJECT__DB__REPLICAS=[{"host": "replica-1"}]
+    #   MY_PROJECT__DB__SLOW_REQUEST_QUERIES=30
+    #   MY_PROJECT__DB__SLOW_REQUEST_DURATION=0.5
     #   MY_PROJECT__API__ROOT=api
     #   MY_PROJECT__API__DOCS_ENABLED=true
     #   MY_PROJECT__API__VERSION=0.2
+    #   MY_PROJECT__CACHE__REDIS_ENABLED=true
     #   MY_PROJECT__SENTRY_DSN=
 
 
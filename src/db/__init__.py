@@ -1,6 +1,19 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
+from candidates_for_external_lib.sqlalchemy.routing import ReplicaSet, RoutingSession
+from candidates_for_external_lib.sqlalchemy.stats import instrument_engine
 from config import settings
 
-engine = create_async_engine(settings.db.dsn, **settings.db.options)
-session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+engine = create_async_engine(settings.db.dsn, **settings.db.engine_options)
+replicas = ReplicaSet(
+    [
+        create_async_engine(dsn, **{**settings.db.engine_options, "pool_logging_name": f"replica_{number}"})
+        for number, dsn in enumerate(settings.db.replica_dsns, start=1)
+    ],
+    retry_after=settings.db.replica_retry_after,
+)
+for instrumented_engine in (engine, *replicas.engines):
+    instrument_engine(instrumented_engine)
+session_factory = async_sessionmaker(
+    bind=engine, expire_on_commit=False, sync_session_class=RoutingSession, replicas=replicas
+)
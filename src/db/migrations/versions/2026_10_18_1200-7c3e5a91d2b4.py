@@ -0,0 +1,52 @@
+"""foreign key and partial indexes for help tables
+
+Revision ID: 7c3e5a91d2b4
+Revises: 1fee2d9b528c
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e5a91d2b4'
+down_revision: Union[str, None] = '1fee2d9b528c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = sa.text('deleted_at IS NULL')
+
+INDEXES = (
+    ('ix_help_subsection_section_id', 'help_subsection', ['section_id'], None),
+    ('ix_help_subsection_section_id_order_active', 'help_subsection', ['section_id', 'order', 'id'], ACTIVE),
+    ('ix_help_section_order_active', 'help_section', ['order', 'id'], ACTIVE),
+    ('ix_help_articlecontent_subsection_id_order', 'help_articlecontent', ['subsection_id', 'order'], None),
+    ('ix_help_articlecontent_widget_id', 'help_articlecontent', ['widget_id'], None),
+    ('ix_help_menu_parent_id_order', 'help_menu', ['parent_id', 'order'], None),
+    ('ix_help_subsectiondocument_subsection_id', 'help_subsectiondocument', ['subsection_id'], None),
+)
+
+
+def is_invalid(name: str) -> bool:
+    stmt = sa.text('SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)')
+    return bool(op.get_bind().scalar(stmt, {'name': name}))
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY не блокирует запись в таблицы, но не может выполняться в транзакции.
+    # прерванное построение оставляет индекс INVALID, который не используется планировщиком:
+    # такой индекс пересоздается, а уже существующий рабочий индекс - ошибка, а не пропуск
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            if is_invalid(name):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            op.create_index(name, table, columns, postgresql_where=where, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
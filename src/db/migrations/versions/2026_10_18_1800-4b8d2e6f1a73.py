@@ -0,0 +1,31 @@
+"""table versions for response caches
+
+Revision ID: 4b8d2e6f1a73
+Revises: 7c3e5a91d2b4
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8d2e6f1a73'
+down_revision: Union[str, None] = '7c3e5a91d2b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'table_version',
+        sa.Column('name', sa.String(length=255), nullable=False, comment='Имя таблицы'),
+        sa.Column('version', sa.BigInteger(), nullable=False, comment='Номер последней зафиксированной версии'),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('table_version')
@@ -1,5 +1,6 @@
+from candidates_for_external_lib.sqlalchemy.models.versions import TableVersion
 from models.help import ArticleContent, Subsection, SubsectionDocument, Section, Widget, Menu
 
 __all__ = [
-    "ArticleContent", "Subsection", "SubsectionDocument", "Section", "Widget", "Menu"
+    "ArticleContent", "Subsection", "SubsectionDocument", "Section", "Widget", "Menu", "TableVersion"
 ]
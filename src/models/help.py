@@ -2,14 +2,14 @@ from datetime import datetime
 from enum import StrEnum
 from uuid import UUID
 
-from sqlalchemy import TIMESTAMP, ForeignKey, String, sql, func
+from sqlalchemy import TIMESTAMP, ForeignKey, Index, String, case, false, sql, func
 from sqlalchemy import UUID as saUUID  # noqa
 from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, declarative_mixin, mapped_column, relationship
 
 from candidates_for_external_lib.sqlalchemy.models.mixins import TimestampzMixin
 from candidates_for_external_lib.sqlalchemy.models.base import Base
-from candidates_for_external_lib.utils.time import utcnow
 
 
 class ReferenceInfoStatus(StrEnum):
@@ -33,6 +33,7 @@ class LastActionModelMixin(TimestampzMixin):
 
 class Menu(LastActionModelMixin, Base):
     __tablename__ = "help_menu"
+    __table_args__ = (Index("ix_help_menu_parent_id_order", "parent_id", "order"),)
     __mapper_args__ = {"eager_defaults": True}
     __repr_attrs__ = ("id", "name", "order")
 
@@ -58,6 +59,11 @@ class Menu(LastActionModelMixin, Base):
 
 class Section(LastActionModelMixin, Base):
     __tablename__ = "help_section"
+    # частичные индексы под выборки неудаленных записей с сортировкой по order
+    __table_args__ = (
+        Index("ix_help_section_order_active", "order", "id", postgresql_where=sql.text("deleted_at IS NULL")),
+    )
+    __mapper_args__ = {"eager_defaults": True}
     __repr_attrs__ = ("id", "code", "name", "status", "order")
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
@@ -76,11 +82,14 @@ class Section(LastActionModelMixin, Base):
 
 class Subsection(LastActionModelMixin, Base):
     __tablename__ = "help_subsection"
+    __table_args__ = (
+        Index("ix_help_subsection_section_id_order_active", "section_id", "order", "id", postgresql_where=sql.text("deleted_at IS NULL")),
+    )
     __repr_attrs__ = ("id", "code", "name", "status", "order")
     __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    section_id: Mapped[int] = mapped_column(ForeignKey("help_section.id"))
+    section_id: Mapped[int] = mapped_column(ForeignKey("help_section.id"), index=True)
     section: Mapped[Section] = relationship(back_populates="subsections")
     code: Mapped[str | None] = mapped_column(String(100), unique=True, comment="Код")
     name: Mapped[str] = mapped_column(String(250))
@@ -104,11 +113,11 @@ class SubsectionDocument(Base):
     __repr_attrs__ = ("id", "document_id")
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    subsection_id: Mapped[int] = mapped_column(ForeignKey("help_subsection.id"))
+    subsection_id: Mapped[int] = mapped_column(ForeignKey("help_subsection.id"), index=True)
     subsection: Mapped[Subsection] = relationship()
     # subsection = models.ForeignKey(Subsection, on_delete=models.CASCADE)
     document_id: Mapped[UUID | None]
-    created_at = mapped_column(TIMESTAMP(timezone=True), default=utcnow, server_default=func.now(), comment="Время удаления")
+    created_at = mapped_column(TIMESTAMP(timezone=True), server_default=func.now(), comment="Время удаления")
 
 
 class ArticleContent(LastActionModelMixin, Base):
@@ -117,6 +126,7 @@ class ArticleContent(LastActionModelMixin, Base):
     """
 
     __tablename__ = "help_articlecontent"
+    __table_args__ = (Index("ix_help_articlecontent_subsection_id_order", "subsection_id", "order"),)
     __mapper_args__ = {"eager_defaults": True}
     __repr_attrs__ = ("id", "subtitle", "content_type", "order")
 
@@ -129,16 +139,28 @@ class ArticleContent(LastActionModelMixin, Base):
     text: Mapped[str | None]
     video_url: Mapped[str | None]
     image_id: Mapped[UUID | None]
-    widget_id: Mapped[int | None] = mapped_column(ForeignKey("help_widget.id"))
+    widget_id: Mapped[int | None] = mapped_column(ForeignKey("help_widget.id"), index=True)
     widget: Mapped["Widget"] = relationship(back_populates="articles")
 
-    @property
+    @hybrid_property
     def has_content(self):
         if self.content_type == ArticleContentType.image:
             return self.image_id is not None
         field_content = getattr(self, self.content_type)
         return field_content != "" and field_content is not None
 
+    @has_content.inplace.expression
+    @classmethod
+    def _has_content_expression(cls):
+        # то же условие в SQL, чтобы проверять заполненность контента агрегатом без загрузки текстов
+        text_types = (ArticleContentType.subtitle, ArticleContentType.text, ArticleContentType.video_url)
+        return case(
+            (cls.content_type == ArticleContentType.image, cls.image_id.is_not(None)),
+            (cls.content_type == ArticleContentType.widget, cls.widget_id.is_not(None)),
+            *((cls.content_type == content_type, func.coalesce(getattr(cls, content_type), "") != "") for content_type in text_types),
+            else_=false(),
+        )
+
 
 class Widget(Base):
     __tablename__ = "help_widget"
@@ -0,0 +1,19 @@
+from redis.asyncio import Redis
+
+from candidates_for_external_lib.cache import LocalCache, RedisCache, ReferenceCache
+from config import settings
+
+# для второго уровня кэша используется тот же Redis, что и для брокера
+redis_cache = (
+    RedisCache(
+        Redis(host=settings.redis_broker.host, port=settings.redis_broker.port),
+        ttl=settings.cache.redis_ttl,
+        key_prefix=settings.cache.key_prefix,
+    )
+    if settings.cache.redis_enabled
+    else None
+)
+
+
+def get_reference_cache(name: str) -> ReferenceCache:
+    return ReferenceCache(name, LocalCache(ttl=settings.cache.ttl, maxsize=settings.cache.maxsize), redis_cache)
@@ -1,18 +1,38 @@
-from sqlalchemy import select, null
+from typing import Any
+
+from sqlalchemy import func, literal, not_, select, null
 from sqlalchemy.orm import selectinload, joinedload
 
-from candidates_for_external_lib.pagination import PageNumberPagination
-from models import Widget, Section, Subsection, ArticleContent
+from candidates_for_external_lib.pagination import PageNumberPagination, CursorPagination
+from candidates_for_external_lib.repositories.cached import CachedRepositoryMixin, invalidate_on_commit
+from candidates_for_external_lib.repositories.constants import CountMode
+from candidates_for_external_lib.repositories.queryset import QuerySet
+from candidates_for_external_lib.sqlalchemy.routing import USE_PRIMARY_OPTION
+from candidates_for_external_lib.sqlalchemy.versions import version_on_commit
+from models import Widget, Section, Subsection, ArticleContent, Menu
+from models.help import ReferenceInfoStatus
+from shared.cache import get_reference_cache
 from shared.repositories.base import BaseRepository
 from web.api.help.filters import SectionFilters, ArticleContentFilters
 
 
-class WidgetsRepository(BaseRepository):
+widgets_cache = get_reference_cache("widgets")
+invalidate_on_commit(Widget, widgets_cache)
+# версии таблиц, по которым проверяется актуальность кэшей ответов справки (см. web.api.help.cache).
+# регистрируются здесь, чтобы версии увеличивала любая запись: и из web, и из tasks
+for versioned_model in (Section, Subsection, ArticleContent, Widget):
+    version_on_commit(versioned_model)
+
+
+class WidgetsRepository(CachedRepositoryMixin, BaseRepository):
     model = Widget
+    conflict_fields = ("code",)
+    cache = widgets_cache
 
 
 class SectionsRepository(BaseRepository):
     model = Section
+    conflict_fields = ("code",)
 
     async def get_section_for_retrieve(self, section_id: int) -> Section | None:
         # todo: кандидат на замену методом кверисета
@@ -31,16 +51,15 @@ class SectionsRepository(BaseRepository):
                 self.model.id == section_id,
                 self.model.deleted_at.is_(null()),
             )
-            .options(
-                selectinload(self.model.subsections.and_(Subsection.deleted_at.is_(null()))).selectinload(
-                    Subsection.article_content
-                )
-            )
+            .options(selectinload(self.model.subsections.and_(Subsection.deleted_at.is_(null()))))
         )
         return await self._session.scalar(stmt)
 
     async def get_list_w_subsections(
-        self, filtering: SectionFilters = None, pagination: PageNumberPagination | None = None
+        self,
+        filtering: SectionFilters = None,
+        pagination: PageNumberPagination | CursorPagination | None = None,
+        count_mode: CountMode | None = None,
     ):
         # todo: кандидат на замену методом кверисета
         stmt = (
@@ -48,19 +67,75 @@ class SectionsRepository(BaseRepository):
             .where(self.model.deleted_at.is_(null()))
             .options(selectinload(self.model.subsections.and_(Subsection.deleted_at.is_(null()))))
         )
-        return await self.get_list(stmt, pagination, filtering)
+        return await self.get_list(stmt, pagination, filtering, count_mode)
 
 
 class SubsectionRepository(BaseRepository):
     model = Subsection
+    conflict_fields = ("code",)
+
+    async def get_unpublished_names_wo_content(self, section_id: int) -> list[str]:
+        # заполненность контента считается агрегатом по подразделам, тексты контента не загружаются
+        stmt = (
+            select(self.model.name)
+            .outerjoin(ArticleContent, ArticleContent.subsection_id == self.model.id)
+            .where(
+                self.model.section_id == section_id,
+                self.model.status == ReferenceInfoStatus.unpublished,
+                self.model.deleted_at.is_(null()),
+            )
+            .group_by(self.model.id)
+            .having(not_(func.bool_or(ArticleContent.has_content)))
+            .order_by(self.model.order, self.model.id)
+        )
+        return list(await self._session.scalars(stmt))
+
+    async def set_status_for_section(self, section_id: int, status: ReferenceInfoStatus) -> int:
+        # один UPDATE по всем неудаленным подразделам раздела, загруженные подразделы обновляются в сессии
+        return await self.objects.filter(section_id=section_id, deleted_at__isnull=True).update(status=status)
 
 
 class ArticleContentRepository(BaseRepository):
     model = ArticleContent
+    # список без фильтров оценивается по статистике таблицы, с фильтрами - по плану запроса
+    count_mode = CountMode.estimated
 
     async def get_list_w_widgets(
-        self, filtering: ArticleContentFilters = None, pagination: PageNumberPagination | None = None
+        self,
+        filtering: ArticleContentFilters = None,
+        pagination: PageNumberPagination | CursorPagination | None = None,
+        count_mode: CountMode | None = None,
     ):
         # todo: кандидат на замену методом кверисета
         stmt = select(self.model).options(joinedload(self.model.widget))
-        return await self.get_list(stmt, pagination, filtering)
+        return await self.get_list(stmt, pagination, filtering, count_mode)
+
+    def get_export_queryset(self, filtering: ArticleContentFilters) -> QuerySet:
+        return self.objects.filter(filtering=filtering).options("widget").order_by(*(filtering.ordering or ["id"]))
+
+
+menu_cache = get_reference_cache("menu")
+invalidate_on_commit(Menu, menu_cache)
+
+
+class MenuRepository(BaseRepository):
+    model = Menu
+
+    def get_export_queryset(self) -> QuerySet:
+        return self.objects.order_by("id")
+
+    async def get_tree_rows(self) -> list[dict[str, Any]]:
+        # все пункты, достижимые от корневых, одним запросом WITH RECURSIVE:
+        # родители идут раньше детей, дети одного родителя - по order
+        table = self.model.__table__
+        tree = select(*table.c, literal(0).label("depth")).where(table.c.parent_id.is_(None)).cte("menu_tree", recursive=True)
+        child = table.alias("child")
+        tree = tree.union_all(select(*child.c, tree.c.depth + 1).join(tree, child.c.parent_id == tree.c.id))
+        stmt = (
+            select(*(tree.c[column.name] for column in table.c))
+            .order_by(tree.c.depth, tree.c.order, tree.c.id)
+            # дерево кэшируется до следующего изменения меню, поэтому читается без отставания реплик
+            .execution_options(**{USE_PRIMARY_OPTION: True})
+        )
+        result = await self._session.execute(stmt)
+        return [dict(row) for row in result.mappings()]
@@ -0,0 +1,10 @@
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from candidates_for_external_lib.repositories import resolver
+from web.dependencies import get_session
+
+
+class EntityResolver(resolver.EntityResolver):
+    def __init__(self, session: AsyncSession = Depends(get_session)):
+        super().__init__(session)
@@ -0,0 +1,11 @@
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from candidates_for_external_lib.repositories import unit_of_work
+from web.dependencies import get_session
+
+
+class UnitOfWork(unit_of_work.UnitOfWork):
+    def __init__(self, session: AsyncSession = Depends(get_session)):
+        # сессия та же, что и у репозиториев запроса: fastapi кэширует зависимость get_session в рамках запроса
+        super().__init__(session)
@@ -0,0 +1,152 @@
+import uuid
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from candidates_for_external_lib.pagination import PageNumberPagination
+from candidates_for_external_lib.repositories.base import BaseRepository
+from candidates_for_external_lib.repositories.constants import CountMode
+from candidates_for_external_lib.repositories.unit_of_work import UnitOfWork
+from models import Section, Widget
+
+
+class SectionsRepository(BaseRepository):
+    model = Section
+    count_mode = CountMode.concurrent
+
+
+class WidgetsRepository(BaseRepository):
+    model = Widget
+    conflict_fields = ("code",)
+
+
+class FailingEntriesRepository(SectionsRepository):
+    async def _fetch_entries(self, query) -> list:
+        return await super()._fetch_entries(select(text("1 / 0")))
+
+
+class FailingCountRepository(SectionsRepository):
+    async def _count_on_separate_connection(self, count_query) -> int:
+        return await super()._count_on_separate_connection(select(text("1 / 0")))
+
+
+class FailingRepository(FailingEntriesRepository, FailingCountRepository):
+    pass
+
+
+@pytest.fixture
+def session_factory(engine):
+    return async_sessionmaker(bind=engine, expire_on_commit=False)
+
+
+async def test_concurrent_count_returns_page_and_count(session_factory):
+    async with session_factory() as session:
+        page = await SectionsRepository(session).get_list(pagination=PageNumberPagination(page=1, limit=5))
+        count = await session.scalar(select(func.count()).select_from(Section))
+
+    assert page["count"] == count
+    assert len(page["results"]) == min(count, 5)
+
+
+async def test_count_connection_returned_to_pool(session_factory, engine):
+    async with session_factory() as session:
+        await SectionsRepository(session).get_list(pagination=PageNumberPagination(page=1, limit=5))
+        # занято только соединение сессии
+        assert engine.pool.checkedout() == 1
+
+    assert engine.pool.checkedout() == 0
+
+
+async def test_count_uses_session_engine(session_factory, engine):
+    async with session_factory() as session:
+        assert SectionsRepository(session)._get_async_engine(select(Section)) is engine
+
+
+@pytest.mark.parametrize("repository_class", [FailingEntriesRepository, FailingCountRepository, FailingRepository])
+async def test_count_connection_returned_to_pool_on_error(session_factory, engine, repository_class):
+    async with session_factory() as session:
+        with pytest.raises(DBAPIError):
+            await repository_class(session).get_list(pagination=PageNumberPagination(page=1, limit=5))
+        assert engine.pool.checkedout() <= 1
+
+    assert engine.pool.checkedout() == 0
+
+
+async def test_count_error_is_raised(session_factory):
+    async with session_factory() as session:
+        with pytest.raises(DBAPIError, match="division by zero"):
+            await FailingCountRepository(session).get_list(pagination=PageNumberPagination(page=1, limit=5))
+
+
+async def test_first_error_is_raised(session_factory):
+    class Repository(FailingCountRepository):
+        async def _fetch_entries(self, query) -> list:
+            raise LookupError("entries")
+
+    async with session_factory() as session:
+        # при ошибке обоих запросов выбрасывается ошибка запроса страницы, ошибка подсчета не теряет соединение
+        with pytest.raises(LookupError, match="entries"):
+            await Repository(session).get_list(pagination=PageNumberPagination(page=1, limit=5))
+
+
+@pytest.fixture
+async def widgets(session_factory):
+    prefix = f"test-{uuid.uuid4().hex[:8]}"
+    async with session_factory() as session:
+        instances = await WidgetsRepository(session).bulk_create(
+            [{"name": "Виджет теста записи", "code": f"{prefix}-{number}"} for number in range(2)]
+        )
+    yield instances
+    async with session_factory() as session:
+        await WidgetsRepository(session).objects.filter(code__startswith=prefix).delete()
+
+
+async def get_names(session_factory, widgets) -> list[str]:
+    # изменения проверяются из другой сессии: видны только зафиксированные
+    async with session_factory() as session:
+        stmt = select(Widget.name).where(Widget.id.in_([widget.id for widget in widgets])).order_by(Widget.id)
+        return list(await session.scalars(stmt))
+
+
+async def test_bulk_update_commits(session_factory, widgets):
+    async with session_factory() as session:
+        await WidgetsRepository(session).bulk_update(
+            [{"id": widget.id, "name": f"Обновлен {number}"} for number, widget in enumerate(widgets)]
+        )
+
+    assert await get_names(session_factory, widgets) == ["Обновлен 0", "Обновлен 1"]
+
+
+async def test_upsert_inserts_and_updates(session_factory, widgets):
+    code = f"{widgets[0].code}-new"
+    async with session_factory() as session:
+        instances = await WidgetsRepository(session).upsert(
+            [{"code": widgets[0].code, "name": "Обновлен"}, {"code": code, "name": "Создан"}]
+        )
+
+    assert instances[0].id == widgets[0].id
+    assert await get_names(session_factory, instances) == ["Обновлен", "Создан"]
+    async with session_factory() as session:
+        await WidgetsRepository(session).objects.filter(code=code).delete()
+
+
+async def test_queryset_update_commits_outside_unit_of_work(session_factory, widgets):
+    async with session_factory() as session:
+        updated = await WidgetsRepository(session).objects.filter(id__in=[widget.id for widget in widgets]).update(
+            name="Обновлен"
+        )
+
+    assert updated == 2
+    assert await get_names(session_factory, widgets) == ["Обновлен", "Обновлен"]
+
+
+async def test_queryset_delete_committed_by_unit_of_work(session_factory, widgets):
+    async with session_factory() as session:
+        async with UnitOfWork(session):
+            await WidgetsRepository(session).objects.filter(id=widgets[0].id).delete()
+            # внутри UnitOfWork запрос не фиксируется
+            assert len(await get_names(session_factory, widgets)) == 2
+
+    assert len(await get_names(session_factory, widgets)) == 1
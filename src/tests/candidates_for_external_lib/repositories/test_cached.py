@@ -0,0 +1,65 @@
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from candidates_for_external_lib.cache import LocalCache, ReferenceCache
+from candidates_for_external_lib.repositories.base import BaseRepository
+from candidates_for_external_lib.repositories.cached import CachedRepositoryMixin, invalidate_on_commit
+from candidates_for_external_lib.repositories.unit_of_work import UnitOfWork
+from models import Widget
+
+widgets_cache = ReferenceCache("test_widgets", LocalCache(ttl=60, maxsize=16))
+invalidate_on_commit(Widget, widgets_cache)
+
+
+class WidgetsRepository(CachedRepositoryMixin, BaseRepository):
+    model = Widget
+    cache = widgets_cache
+    copy_threshold = 2
+
+
+@pytest.fixture
+async def session(engine):
+    async with async_sessionmaker(bind=engine, expire_on_commit=False)() as session:
+        yield session
+
+
+@pytest.fixture
+async def repository(session):
+    repository = WidgetsRepository(session)
+    await widgets_cache.invalidate()
+    await repository.all()
+    assert await widgets_cache.get("all") is not None
+    return repository
+
+
+async def test_cache_invalidated_after_commit_of_unit_of_work(session, repository):
+    async with UnitOfWork(session):
+        widget = await repository.create(name="Виджет теста кэша", code=f"test-{uuid.uuid4().hex[:8]}")
+        # до фиксации кэш не сбрасывается: иначе другой запрос успел бы снова закэшировать старые данные
+        assert await widgets_cache.get("all") is not None
+
+    assert await widgets_cache.get("all") is None
+    await repository.delete_by_id(widget.id)
+
+
+async def test_cache_kept_after_rollback(session, repository):
+    with pytest.raises(LookupError):
+        async with UnitOfWork(session):
+            await repository.create(name="Виджет теста кэша", code=f"test-{uuid.uuid4().hex[:8]}")
+            raise LookupError
+
+    assert await widgets_cache.get("all") is not None
+
+
+async def test_cache_invalidated_after_copy(session, repository):
+    prefix = f"test-{uuid.uuid4().hex[:8]}"
+    values = [{"name": "Виджет теста кэша", "code": f"{prefix}-{number}"} for number in range(3)]
+    async with UnitOfWork(session):
+        # COPY идет в обход событий ORM
+        await repository.bulk_create(values, returning=False)
+        assert await widgets_cache.get("all") is not None
+
+    assert await widgets_cache.get("all") is None
+    await repository.objects.filter(code__startswith=prefix).delete()
@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import func
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from candidates_for_external_lib.repositories.base import BaseRepository
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Event(Base):
+    __tablename__ = "test_event"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str]
+    kind: Mapped[str] = mapped_column(default="info")
+    created_at: Mapped[str] = mapped_column(default=func.now())
+
+
+class EventRepository(BaseRepository):
+    model = Event
+
+
+async def test_copy_rejects_missing_clause_default():
+    # проверка выполняется до обращения к БД
+    with pytest.raises(ValueError, match="test_event.created_at"):
+        await EventRepository(session=None)._copy([{"name": "a"}])
+
+
+def test_copy_value_uses_python_default():
+    column = Event.__table__.c.kind
+
+    assert BaseRepository._get_copy_value({"name": "a"}, column) == "info"
+    assert BaseRepository._get_copy_value({"name": "a", "kind": "error"}, column) == "error"
@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from candidates_for_external_lib.repositories.queryset import QuerySet
+from models import ArticleContent
+
+
+def compile_sql(queryset: QuerySet) -> str:
+    # сессия для построения запроса не нужна
+    return str(queryset._build_stmt().compile(dialect=postgresql.dialect()))
+
+
+def assert_single_joins(sql: str) -> None:
+    # каждое отношение пути присоединено один раз под псевдонимом из пути
+    assert sql.count(" JOIN ") == 2
+    assert sql.count("JOIN help_subsection AS subsection ON") == 1
+    assert sql.count("JOIN help_section AS subsection__section ON") == 1
+    assert "LEFT OUTER JOIN" not in sql
+
+
+@pytest.fixture
+def queryset():
+    return QuerySet(ArticleContent, session=None)
+
+
+def test_chained_filters_reuse_join(queryset):
+    sql = compile_sql(queryset.filter(subsection__section__name="Раздел").filter(subsection__section__order__gt=1))
+
+    assert_single_joins(sql)
+    assert "WHERE subsection__section.name = " in sql
+    assert "AND subsection__section.\"order\" > " in sql
+
+
+def test_filter_and_order_by_reuse_join(queryset):
+    sql = compile_sql(queryset.filter(subsection__section__name="Раздел").order_by("-subsection__section__name"))
+
+    assert_single_joins(sql)
+    assert "ORDER BY subsection__section.name DESC" in sql
+
+
+def test_options_use_existing_join(queryset):
+    sql = compile_sql(queryset.filter(subsection__section__name="Раздел").options("subsection__section"))
+
+    assert_single_joins(sql)
+    # связанные записи читаются из того же join-а (contains_eager), а не из отдельного joinedload
+    assert "SELECT subsection__section.id" in sql
+    assert "subsection.id AS" in sql
+    assert "help_section_1" not in sql
@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from candidates_for_external_lib.sqlalchemy.routing import (
+    READ_ONLY_KEY, REPLICA_KEY, USE_PRIMARY_KEY, ReplicaSet, RoutingSession
+)
+from models import Section
+
+DSN = "postgresql+asyncpg://user:password@{host}/db"
+
+
+@pytest.fixture
+def primary():
+    return create_async_engine(DSN.format(host="primary")).sync_engine
+
+
+@pytest.fixture
+def replicas():
+    # подключения не выполняются: проверяется только выбор движка
+    return ReplicaSet([create_async_engine(DSN.format(host=f"replica-{number}")) for number in (1, 2)])
+
+
+@pytest.fixture
+def session(primary, replicas):
+    return RoutingSession(bind=primary, replicas=replicas)
+
+
+def test_session_reads_from_one_replica(session, replicas):
+    binds = {session.get_bind(clause=select(Section)) for _ in range(4)}
+
+    assert len(binds) == 1
+    assert binds.pop() in {engine.sync_engine for engine in replicas.engines}
+
+
+def test_sessions_use_replicas_in_turn(primary, replicas):
+    first = RoutingSession(bind=primary, replicas=replicas).get_bind(clause=select(Section))
+    second = RoutingSession(bind=primary, replicas=replicas).get_bind(clause=select(Section))
+
+    assert first is not second
+
+
+def test_session_switches_to_primary_when_replica_is_unhealthy(session, primary, replicas):
+    replica = session.get_bind(clause=select(Section))
+    replicas._mark_unhealthy(replica)
+
+    assert session.get_bind(clause=select(Section)) is primary
+    assert session.info[USE_PRIMARY_KEY]
+    # после возврата реплики в работу сессия продолжает читать из основной БД
+    replicas._unhealthy_until.clear()
+    assert session.get_bind(clause=select(Section)) is primary
+
+
+def test_session_reads_from_primary_after_write(session, primary):
+    session.get_bind(clause=select(Section))
+
+    assert session.get_bind(clause=update(Section).values(name="name")) is primary
+    assert session.get_bind(clause=select(Section)) is primary
+
+
+def test_session_reads_from_primary_without_healthy_replicas(session, primary, replicas):
+    for engine in replicas.engines:
+        replicas._mark_unhealthy(engine.sync_engine)
+
+    assert session.get_bind(clause=select(Section)) is primary
+    assert session.info[REPLICA_KEY] is None
+
+
+def test_read_only_session_reads_in_autocommit(primary, replicas):
+    session = RoutingSession(bind=primary, replicas=replicas, info={READ_ONLY_KEY: True})
+
+    bind = session.get_bind(clause=select(Section))
+
+    assert bind.get_execution_options()["isolation_level"] == "AUTOCOMMIT"
+    # представление движка реплики с ее пулом
+    assert bind.pool in {engine.sync_engine.pool for engine in replicas.engines}
+
+
+def test_read_only_session_streams_in_transaction(primary, replicas):
+    # серверный курсор asyncpg работает только внутри транзакции
+    session = RoutingSession(bind=primary, replicas=replicas, info={READ_ONLY_KEY: True})
+
+    bind = session.get_bind(clause=select(Section).execution_options(yield_per=100))
+
+    assert "isolation_level" not in bind.get_execution_options()
@@ -0,0 +1,47 @@
+import pytest
+from sqlalchemy import text
+
+from candidates_for_external_lib.sqlalchemy.stats import assert_num_queries, instrument_engine, query_stats
+
+
+async def test_counts_statements(engine):
+    instrument_engine(engine)
+
+    async with engine.connect() as connection:
+        with assert_num_queries(2) as stats:
+            await connection.execute(text("SELECT 1"))
+            await connection.execute(text("SELECT 2"))
+
+    assert stats.statements == ["SELECT 1", "SELECT 2"]
+
+
+async def test_lists_statements_on_mismatch(engine):
+    instrument_engine(engine)
+
+    async with engine.connect() as connection:
+        with pytest.raises(AssertionError, match=r"Ожидалось SQL-запросов: 1, выполнено: 2\n1\. SELECT 1\n2\. SELECT 2"):
+            with assert_num_queries(1):
+                await connection.execute(text("SELECT 1"))
+                await connection.execute(text("SELECT 2"))
+
+
+async def test_counts_failed_statement(engine):
+    instrument_engine(engine)
+
+    async with engine.connect() as connection:
+        with assert_num_queries(1):
+            with pytest.raises(Exception, match="division by zero"):
+                await connection.execute(text("SELECT 1 / 0"))
+
+
+async def test_nested_statements_counted_in_outer_block(engine):
+    instrument_engine(engine)
+
+    async with engine.connect() as connection:
+        with assert_num_queries(2):
+            await connection.execute(text("SELECT 1"))
+            with query_stats() as inner:
+                await connection.execute(text("SELECT 2"))
+
+    assert inner.count == 1
+
@@ -0,0 +1,66 @@
+import uuid
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from candidates_for_external_lib.repositories.base import BaseRepository
+from candidates_for_external_lib.repositories.unit_of_work import UnitOfWork
+from candidates_for_external_lib.sqlalchemy.versions import get_versions, version_on_commit
+from models import Section, Widget
+
+committed = []
+version_on_commit(Widget, lambda: committed.append(Widget))
+
+
+class WidgetsRepository(BaseRepository):
+    model = Widget
+
+
+def test_versions_selected_by_table_name():
+    stmt = select(*get_versions(Section, Widget))
+    sql = " ".join(str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})).split())
+
+    assert "FROM table_version WHERE table_version.name = 'help_section'" in sql
+    assert "FROM table_version WHERE table_version.name = 'help_widget'" in sql
+
+
+@pytest.fixture
+async def session(engine):
+    async with async_sessionmaker(bind=engine, expire_on_commit=False)() as session:
+        yield session
+
+
+async def get_version(session) -> int:
+    async with session.begin():
+        return await session.scalar(select(*get_versions(Widget))) or 0
+
+
+async def test_version_incremented_on_commit(session):
+    version = await get_version(session)
+    committed.clear()
+    repository = WidgetsRepository(session)
+
+    async with UnitOfWork(session):
+        widget = await repository.create(name="Виджет теста версий", code=f"test-{uuid.uuid4().hex[:8]}")
+        # до фиксации функции не вызываются
+        assert committed == []
+
+    assert await get_version(session) == version + 1
+    assert committed == [Widget]
+    await repository.delete_by_id(widget.id)
+    assert await get_version(session) == version + 2
+
+
+async def test_version_kept_after_rollback(session):
+    version = await get_version(session)
+    committed.clear()
+
+    with pytest.raises(LookupError):
+        async with UnitOfWork(session):
+            await WidgetsRepository(session).create(name="Виджет теста версий", code=f"test-{uuid.uuid4().hex[:8]}")
+            raise LookupError
+
+    assert await get_version(session) == version
+    assert committed == []
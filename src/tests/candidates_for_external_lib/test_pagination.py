@@ -0,0 +1,42 @@
+import base64
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from candidates_for_external_lib.pagination import CursorPagination
+from models import Section
+
+
+def get_cursor(position: list, reverse: bool = False) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps({"p": position, "r": reverse})).decode().rstrip("=")
+
+
+def compile_where(pagination: CursorPagination, ordering: list[str]) -> str:
+    query = pagination.paginate(select(Section), Section, ordering)
+    return str(query.whereclause.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_same_direction_uses_row_comparison():
+    sql = compile_where(CursorPagination(cursor=get_cursor([5, 10])), ["order"])
+
+    assert sql == '(help_section."order", help_section.id) > (5, 10)'
+
+
+def test_previous_page_uses_reversed_row_comparison():
+    sql = compile_where(CursorPagination(cursor=get_cursor([5, 10], reverse=True)), ["order"])
+
+    assert sql == '(help_section."order", help_section.id) < (5, 10)'
+
+
+def test_mixed_directions_skip_null_conditions_for_not_null_columns():
+    sql = compile_where(CursorPagination(cursor=get_cursor([5, 10])), ["-order"])
+
+    assert sql == 'help_section."order" < 5 OR help_section."order" = 5 AND help_section.id > 10'
+
+
+def test_nullable_column_keeps_null_conditions():
+    sql = compile_where(CursorPagination(cursor=get_cursor(["2026-01-01T00:00:00", 10])), ["deleted_at"])
+
+    assert "help_section.deleted_at IS NULL" in sql
+    assert "(help_section.deleted_at, help_section.id) >" not in sql
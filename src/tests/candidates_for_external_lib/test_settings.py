@@ -0,0 +1,45 @@
+import pytest
+
+from candidates_for_external_lib import settings
+from candidates_for_external_lib.settings import UvicornMode, UvicornSettings, get_cpu_quota
+
+
+@pytest.fixture
+def cgroup(tmp_path, monkeypatch):
+    # файлы cgroup подменяются временными, по умолчанию - отсутствуют
+    monkeypatch.setattr(settings, "CGROUP_V2_CPU_MAX", tmp_path / "cpu.max")
+    monkeypatch.setattr(settings, "CGROUP_V1_CPU_QUOTA", tmp_path / "cpu.cfs_quota_us")
+    monkeypatch.setattr(settings, "CGROUP_V1_CPU_PERIOD", tmp_path / "cpu.cfs_period_us")
+    monkeypatch.setattr(settings.os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    ("files", "expected"),
+    [
+        ({}, None),
+        ({"cpu.max": "max 100000\n"}, None),
+        ({"cpu.max": "150000 100000\n"}, 1.5),
+        ({"cpu.cfs_quota_us": "-1\n", "cpu.cfs_period_us": "100000\n"}, None),
+        ({"cpu.cfs_quota_us": "200000\n", "cpu.cfs_period_us": "100000\n"}, 2),
+    ],
+)
+def test_cpu_quota(cgroup, files, expected):
+    for name, content in files.items():
+        (cgroup / name).write_text(content)
+
+    assert get_cpu_quota() == expected
+
+
+@pytest.mark.parametrize(("cpu_max", "expected"), [(None, 8), ("max 100000", 8), ("150000 100000", 2), ("50000 100000", 1)])
+def test_worker_count_limited_by_cpu_quota(cgroup, cpu_max, expected):
+    if cpu_max is not None:
+        (cgroup / "cpu.max").write_text(cpu_max)
+
+    assert UvicornSettings(mode=UvicornMode.production).worker_count == expected
+
+
+def test_explicit_workers_ignore_cpu_quota(cgroup):
+    (cgroup / "cpu.max").write_text("100000 100000")
+
+    assert UvicornSettings(mode=UvicornMode.production, workers=4).worker_count == 4
@@ -0,0 +1,53 @@
+from candidates_for_external_lib.utils.tree import build_tree
+
+
+def names(nodes: list[dict]) -> list:
+    return [(node["name"], names(node["children"])) for node in nodes]
+
+
+def test_children_keep_row_order():
+    rows = [
+        {"id": 2, "parent_id": None, "name": "b"},
+        {"id": 1, "parent_id": None, "name": "a"},
+        {"id": 4, "parent_id": 2, "name": "b2"},
+        {"id": 3, "parent_id": 2, "name": "b1"},
+    ]
+
+    assert names(build_tree(rows)) == [("b", [("b2", []), ("b1", [])]), ("a", [])]
+
+
+def test_nested_levels():
+    rows = [
+        {"id": 1, "parent_id": None, "name": "a"},
+        {"id": 2, "parent_id": 1, "name": "a1"},
+        {"id": 3, "parent_id": 2, "name": "a11"},
+        {"id": 4, "parent_id": 3, "name": "a111"},
+    ]
+
+    assert names(build_tree(rows)) == [("a", [("a1", [("a11", [("a111", [])])])])]
+
+
+def test_orphans_and_their_descendants_skipped():
+    rows = [
+        {"id": 1, "parent_id": None, "name": "a"},
+        {"id": 2, "parent_id": 99, "name": "orphan"},
+        {"id": 3, "parent_id": 2, "name": "orphan child"},
+        # ребенок раньше родителя: строки должны идти от родителей к детям
+        {"id": 4, "parent_id": 5, "name": "early child"},
+        {"id": 5, "parent_id": 1, "name": "a1"},
+    ]
+
+    assert names(build_tree(rows)) == [("a", [("a1", [])])]
+
+
+def test_custom_keys_and_rows_not_modified():
+    rows = [{"pk": 1, "parent": None}, {"pk": 2, "parent": 1}]
+
+    tree = build_tree(rows, id_key="pk", parent_key="parent", children_key="items")
+
+    assert tree == [{"pk": 1, "parent": None, "items": [{"pk": 2, "parent": 1, "items": []}]}]
+    assert rows == [{"pk": 1, "parent": None}, {"pk": 2, "parent": 1}]
+
+
+def test_empty():
+    assert build_tree([]) == []
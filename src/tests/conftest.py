@@ -0,0 +1,23 @@
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+
+@pytest.fixture
+async def engine():
+    # тесты с БД выполняются, только если заданы настройки MY_PROJECT__DB__* и сервер доступен
+    try:
+        from config import settings
+    except ValidationError:
+        pytest.skip("не заданы настройки БД")
+    engine = create_async_engine(settings.db.dsn, pool_size=2, max_overflow=0)
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except (OSError, DBAPIError) as exc:
+        await engine.dispose()
+        pytest.skip(f"БД недоступна: {exc}")
+    yield engine
+    await engine.dispose()
@@ -0,0 +1,47 @@
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from models import Menu
+
+
+@pytest.fixture
+async def session(engine):
+    # пункты меню создаются в транзакции теста и откатываются
+    async with async_sessionmaker(bind=engine, expire_on_commit=False)() as session:
+        yield session
+        await session.rollback()
+
+
+async def test_tree_rows_go_from_parents_to_children(session):
+    prefix = f"test-{uuid.uuid4().hex[:8]}"
+
+    def menu(name: str, order: int, parent: Menu | None = None) -> Menu:
+        return Menu(name=f"{prefix}-{name}", description=name, order=order, parent_id=parent and parent.id)
+
+    root = menu("root", 1)
+    session.add(root)
+    await session.flush()
+    second, first = menu("second", 2, root), menu("first", 1, root)
+    session.add_all([second, first])
+    await session.flush()
+    nested = menu("nested", 1, first)
+    # пункты, недостижимые от корневых (цикл), в дерево не попадают
+    cycle = menu("cycle", 1)
+    session.add_all([nested, cycle])
+    await session.flush()
+    cycle_child = menu("cycle child", 1, cycle)
+    session.add(cycle_child)
+    await session.flush()
+    cycle.parent_id = cycle_child.id
+    await session.flush()
+
+    # репозитории приложения требуют настроек БД
+    from shared.repositories.help import MenuRepository
+
+    rows = [row for row in await MenuRepository(session).get_tree_rows() if row["name"].startswith(prefix)]
+
+    assert [row["description"] for row in rows] == ["root", "first", "second", "nested"]
+    assert rows[3]["parent_id"] == first.id
+    assert "depth" not in rows[0]
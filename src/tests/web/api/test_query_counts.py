@@ -0,0 +1,55 @@
+import httpx
+import pytest
+from sqlalchemy import delete
+
+from candidates_for_external_lib.sqlalchemy.stats import assert_num_queries
+
+SECTION = {"name": "Раздел теста запросов", "status": "unpublished", "page_url": "http://example.com", "order": 1}
+
+
+@pytest.fixture
+async def client(engine):
+    # запросы считаются на движке приложения (см. db.instrument_engine)
+    import db
+    from web.app import get_app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=get_app()), base_url="http://test/api") as client:
+        yield client
+    await db.engine.dispose()
+
+
+@pytest.fixture
+async def section_id(client):
+    import db
+    from models import Section, Subsection
+
+    response = await client.post("/section", json=SECTION)
+    section_id = response.json()["id"]
+    yield section_id
+    async with db.session_factory() as session:
+        await session.execute(delete(Subsection).where(Subsection.section_id == section_id))
+        await session.execute(delete(Section).where(Section.id == section_id))
+        await session.commit()
+
+
+async def test_update_section(client, section_id):
+    # раздел с подразделами, UPDATE, увеличение версии таблицы
+    with assert_num_queries(4):
+        response = await client.put(f"/section/{section_id}", json={**SECTION, "order": 2})
+
+    assert response.status_code == 200
+
+
+async def test_get_sections(client, section_id):
+    from web.api.help.cache import SectionListResponseCache
+
+    SectionListResponseCache.invalidate()
+    # версии таблиц, страница, подразделы страницы, количество
+    with assert_num_queries(4):
+        response = await client.get("/section", params={"limit": 5})
+    assert response.status_code == 200
+
+    # ответ из кэша: только версии таблиц
+    with assert_num_queries(1):
+        response = await client.get("/section", params={"limit": 5})
+    assert response.status_code == 200
@@ -0,0 +1,27 @@
+import pytest
+from sqlalchemy import exists, select
+
+from candidates_for_external_lib.sqlalchemy.advisor import QueryAdvisor
+
+
+@pytest.fixture
+async def seeded_engine(engine):
+    # проверка планов имеет смысл только на БД с данными справки (см. benchmarks.repositories)
+    import db
+    from models import ArticleContent
+
+    async with engine.connect() as connection:
+        if not await connection.scalar(select(exists().where(ArticleContent.id.is_not(None)))):
+            pytest.skip("в БД нет данных справки")
+    yield db.engine
+    # соединения пула привязаны к циклу событий теста
+    await db.engine.dispose()
+
+
+async def test_help_queries_use_indexes(seeded_engine):
+    from benchmarks.advisor import run_queries
+
+    async with QueryAdvisor(seeded_engine, min_rows=1000) as advisor:
+        await run_queries()
+
+    advisor.assert_no_seq_scans()
@@ -0,0 +1,40 @@
+import pytest
+from fastapi import Request
+from sqlalchemy import event, text
+
+
+@pytest.fixture
+async def app_engine(engine):
+    # зависимость работает с движком приложения
+    import db
+
+    yield db.engine
+    await db.engine.dispose()
+
+
+async def run_request(method: str) -> tuple[str | None, bool, int]:
+    # уровень изоляции соединения, открыта ли транзакция драйвера и количество фиксаций за время запроса
+    from web.dependencies import get_session
+
+    generator = get_session(Request({"type": "http", "method": method, "headers": []}))
+    session = await anext(generator)
+    commits = []
+    event.listen(session.sync_session, "after_commit", lambda session: commits.append(session))
+    connection = await session.connection()
+    await session.execute(text("SELECT 1"))
+    isolation_level = connection.sync_connection.get_execution_options().get("isolation_level")
+    in_transaction = connection.sync_connection.connection.driver_connection.is_in_transaction()
+    # завершение зависимости после ответа
+    with pytest.raises(StopAsyncIteration):
+        await anext(generator)
+    return isolation_level, in_transaction, len(commits)
+
+
+@pytest.mark.parametrize("method", ["GET", "HEAD", "OPTIONS"])
+async def test_safe_method_reads_without_transaction(app_engine, method):
+    assert await run_request(method) == ("AUTOCOMMIT", False, 0)
+
+
+@pytest.mark.parametrize("method", ["POST", "PUT", "DELETE"])
+async def test_unsafe_method_commits(app_engine, method):
+    assert await run_request(method) == (None, True, 1)
@@ -1,15 +1,67 @@
+import importlib.util
+import logging
+
 import uvicorn
+from uvicorn.supervisors import Multiprocess
 
+from candidates_for_external_lib.servers import JitteredServer
+from candidates_for_external_lib.settings import UvicornMode, UvicornSettings
 from config import settings
 
+APP = "web.app:get_app"
+# реализации из зависимостей uvloop, httptools (на Windows uvloop не устанавливается)
+OPTIONAL_IMPLEMENTATIONS = frozenset(("uvloop", "httptools"))
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def get_implementation(name: str) -> str:
+    if name in OPTIONAL_IMPLEMENTATIONS and importlib.util.find_spec(name) is None:
+        logger.warning("%s не установлен, используется реализация по умолчанию", name)
+        return "auto"
+    return name
+
+
+def run_production(uvicorn_settings: UvicornSettings) -> None:
+    # воркер, завершившийся по limit_max_requests, дожидается обработки начатых запросов
+    # (timeout_graceful_shutdown), а Multiprocess запускает вместо него новый
+    config = uvicorn.Config(
+        APP,
+        factory=True,
+        host=uvicorn_settings.host,
+        port=uvicorn_settings.port,
+        workers=uvicorn_settings.worker_count,
+        log_level=uvicorn_settings.log_level,
+        # запросы логирует AccessLogMiddleware через очередь, access-лог uvicorn их бы дублировал
+        access_log=False,
+        loop=get_implementation(uvicorn_settings.loop),
+        http=get_implementation(uvicorn_settings.http),
+        backlog=uvicorn_settings.backlog,
+        timeout_keep_alive=uvicorn_settings.timeout_keep_alive,
+        limit_concurrency=uvicorn_settings.limit_concurrency,
+        limit_max_requests=uvicorn_settings.limit_max_requests,
+        timeout_graceful_shutdown=uvicorn_settings.timeout_graceful_shutdown,
+    )
+    server = JitteredServer(config, uvicorn_settings.limit_max_requests_jitter)
+    # без супервизора единственный воркер, достигнув limit_max_requests, завершил бы весь процесс
+    if config.workers > 1 or config.limit_max_requests is not None:
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+
 
 def main():
+    if settings.uvicorn.mode == UvicornMode.production:
+        return run_production(settings.uvicorn)
     uvicorn.run(
-        "web.app:get_app",
-        workers=settings.uvicorn.workers,
+        APP,
+        workers=settings.uvicorn.worker_count,
         host=settings.uvicorn.host,
         port=settings.uvicorn.port,
         reload=settings.uvicorn.reload,
+        log_level=settings.uvicorn.log_level,
+        access_log=False,
+        limit_max_requests=settings.uvicorn.limit_max_requests,
         factory=True,
     )
 
@@ -0,0 +1,44 @@
+from fastapi import Depends, Request
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from candidates_for_external_lib.cache import LocalCache
+from candidates_for_external_lib.responses.cache import ResponseCache
+from candidates_for_external_lib.sqlalchemy.versions import get_versions, version_on_commit
+from config import settings
+from models import Section, Subsection, ArticleContent, Widget
+from web.dependencies import get_session
+
+sections_responses = LocalCache(ttl=settings.cache.ttl, maxsize=settings.cache.maxsize)
+article_content_responses = LocalCache(ttl=settings.cache.ttl, maxsize=settings.cache.maxsize)
+
+
+class HelpResponseCache(ResponseCache):
+    def __init__(self, request: Request, session: AsyncSession = Depends(get_session)):
+        super().__init__(request, session)
+
+
+class SectionResponseCache(HelpResponseCache):
+    responses = sections_responses
+
+    def get_watermark_stmt(self) -> Select:
+        return select(*get_versions(Section, Subsection))
+
+
+class SectionListResponseCache(SectionResponseCache):
+    pass
+
+
+class ArticleContentResponseCache(HelpResponseCache):
+    responses = article_content_responses
+
+    def get_watermark_stmt(self) -> Select:
+        return select(*get_versions(ArticleContent, Widget))
+
+
+# версии таблиц увеличивает любая запись (см. shared.repositories.help),
+# здесь после фиксации освобождается память от ответов, которые больше не будут отданы
+for model in (Section, Subsection):
+    version_on_commit(model, SectionResponseCache.invalidate)
+for model in (ArticleContent, Widget):
+    version_on_commit(model, ArticleContentResponseCache.invalidate)
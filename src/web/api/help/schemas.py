@@ -56,3 +56,19 @@ class CreateUpdateArticleContentSchema(BaseModel):
     content_type: str
     image_id: UUID | None
     widget_id: PositiveInt
+
+
+class MenuSchema(BaseModel):
+    id: int
+    parent_id: int | None
+    name: str
+    description: str
+    image_url: str | None
+    page_url: str | None
+    order: int
+    is_modal: bool
+    modal_text: str | None
+
+
+class MenuTreeSchema(MenuSchema):
+    children: list["MenuTreeSchema"]
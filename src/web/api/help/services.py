@@ -1,13 +1,19 @@
+from typing import Any
+
 from fastapi import Depends
 
 from candidates_for_external_lib.pagination import PageNumberPagination
+from candidates_for_external_lib.responses.json import dump_json
+from candidates_for_external_lib.utils.tree import build_tree
 from models import Section
-from models.help import ReferenceInfoStatus, Subsection, ArticleContent
+from models.help import ReferenceInfoStatus, Subsection, ArticleContent, Widget
 from shared.repositories.help import SectionsRepository, SubsectionRepository, ArticleContentRepository, \
-    WidgetsRepository
+    MenuRepository, menu_cache
+from shared.repositories.resolver import EntityResolver
+from shared.repositories.unit_of_work import UnitOfWork
 from web.api.help.filters import ArticleContentFilters
-from web.api.help.schemas import CreateUpdateSectionSchema, CreateUpdateArticleContentSchema
-from web.api.help.utils import is_published_instance, subsection_has_content, delete_section
+from web.api.help.schemas import CreateUpdateSectionSchema, CreateUpdateArticleContentSchema, MenuTreeSchema
+from web.api.help.utils import is_published_instance, delete_section
 from web.exceptions import AnyBodyBadRequestError, NotFoundError, RequestBodyValidationError
 from web.mixins import GetOr404Mixin
 
@@ -17,30 +23,37 @@ class CreateSectionService:
         self,
         section_repository: SectionsRepository = Depends(),
         subsection_repository: SubsectionRepository = Depends(),
+        unit_of_work: UnitOfWork = Depends(),
     ):
         self._section_repository = section_repository
         self._subsection_repository = subsection_repository
+        self._unit_of_work = unit_of_work
 
     async def create_section(self, data: CreateUpdateSectionSchema) -> Section:
-        section = await self._section_repository.create(**data.model_dump(), subsections=[])
-        await self._subsection_repository.create(section=section, name="Новый подраздел", order=1)
+        async with self._unit_of_work:
+            section = await self._section_repository.create(**data.model_dump(), subsections=[])
+            await self._subsection_repository.create(section=section, name="Новый подраздел", order=1)
         return section
 
 
 class SectionUpdateService:
-    def __init__(self, section_repository: SectionsRepository = Depends()):
+    def __init__(
+        self,
+        section_repository: SectionsRepository = Depends(),
+        subsection_repository: SubsectionRepository = Depends(),
+    ):
         self._section_repository = section_repository
+        self._subsection_repository = subsection_repository
 
     async def update_section(self, section_id: int, data: dict) -> Section:
         section = await self._get_section(section_id)
         if section.is_released and data["status"] == ReferenceInfoStatus.unpublished:
-            self._unpublish_child_subsections(section)
+            await self._subsection_repository.set_status_for_section(section.id, ReferenceInfoStatus.unpublished)
         if is_published_instance(data["status"], section):
-            if subsections_wo_content := self._get_unpublished_child_subsections_wo_content(section):
-                subs_names = [subs.name for subs in subsections_wo_content]
+            if subs_names := await self._subsection_repository.get_unpublished_names_wo_content(section.id):
                 err_msg = ["Необходимо добавить контент в подраздел(ы) (" + "; ".join(subs_names) + ";)"]
                 raise AnyBodyBadRequestError(err_msg)
-            self._publish_child_subsections(section)
+            await self._subsection_repository.set_status_for_section(section.id, ReferenceInfoStatus.published)
         return section.update(**data)
 
     async def _get_section(self, section_id: int) -> Section:
@@ -49,24 +62,6 @@ class SectionUpdateService:
             return section
         raise NotFoundError
 
-    def _publish_child_subsections(self, section: Section) -> None:
-        for ss in section.subsections:
-            ss.status = ReferenceInfoStatus.published
-
-    def _unpublish_child_subsections(self, section: Section) -> None:
-        for ss in section.subsections:
-            ss.status = ReferenceInfoStatus.unpublished
-
-    def _get_unpublished_child_subsections_wo_content(self, section: Section) -> set[Subsection]:
-        subsections_wo_content = set()
-        subsections = (
-            ss for ss in section.subsections if ss.status == ReferenceInfoStatus.unpublished and ss.deleted_at is None
-        )
-        for subsection in subsections:
-            if not subsection_has_content(subsection):
-                subsections_wo_content.add(subsection)
-        return subsections_wo_content
-
 
 class SectionDeleteService(GetOr404Mixin):
     def __init__(self, section_repository: SectionsRepository = Depends()):
@@ -84,19 +79,23 @@ class SectionDeleteService(GetOr404Mixin):
 
 class ArticleContentCreateUpdateValidationMixin:
 
-    async def _validate(self, data: CreateUpdateArticleContentSchema) -> dict:
+    async def _resolve(self, data: CreateUpdateArticleContentSchema, **lookups) -> dict[str, Any]:
+        # виджет, подраздел и переданные дополнительно записи получаются одним запросом
+        return await self._entity_resolver.resolve(
+            widget=(Widget, data.widget_id), subsection=(Subsection, data.subsection_id), **lookups
+        )
+
+    def _validate(self, data: CreateUpdateArticleContentSchema, entities: dict[str, Any]) -> dict:
         validation_errors = {}
-        widget = await self._widget_repository.get_by_pk(data.widget_id)
-        if not widget:
+        if not entities["widget"]:
             validation_errors["widget_id"] = ["Виджет не найден"]
-        subsection = await self._subsection_repository.get_by_pk(data.subsection_id)
-        if not subsection:
+        if not entities["subsection"]:
             validation_errors["subsection_id"] = ["Подраздел не найден"]
         if validation_errors:
             raise RequestBodyValidationError(validation_errors)
         data = data.model_dump()
         data.pop("widget_id")
-        data["widget"] = widget
+        data["widget"] = entities["widget"]
         return data
 
 
@@ -104,40 +103,47 @@ class ArticleContentCreateService(ArticleContentCreateUpdateValidationMixin, Get
     def __init__(
         self,
         article_content_repository: ArticleContentRepository = Depends(),
-        widget_repository: WidgetsRepository = Depends(),
-        subsection_repository: SubsectionRepository = Depends(),
+        entity_resolver: EntityResolver = Depends(),
     ):
         self._article_content_repository = article_content_repository
-        self._widget_repository = widget_repository
-        self._subsection_repository = subsection_repository
+        self._entity_resolver = entity_resolver
 
     async def create_article_content(self, data: CreateUpdateArticleContentSchema) -> ArticleContent:
-        validated_data = await self._validate(data)
+        entities = await self._resolve(data)
+        validated_data = self._validate(data, entities)
         return await self._article_content_repository.create(**validated_data)
 
 
 class ArticleContentUpdateService(ArticleContentCreateUpdateValidationMixin, GetOr404Mixin):
     # по идее схема для обновления не должна включать возможность изменения подраздела,
     # а валидация не должна запрашивать виджет, если виджет не меняется
-    def __init__(
-        self,
-        article_content_repository: ArticleContentRepository = Depends(),
-        widget_repository: WidgetsRepository = Depends(),
-        subsection_repository: SubsectionRepository = Depends(),
-    ):
-        self._article_content_repository = article_content_repository
-        self._widget_repository = widget_repository
-        self._subsection_repository = subsection_repository
+    def __init__(self, entity_resolver: EntityResolver = Depends()):
+        self._entity_resolver = entity_resolver
 
     async def update_article_content(
         self, article_content_id: int, data: CreateUpdateArticleContentSchema
     ) -> ArticleContent:
-        article_content = await self._get_article_content(article_content_id)
-        validated_data = await self._validate(data)  # наверно вместо put иметь только patch
+        # обновляемый контент статьи получается тем же запросом, что и записи для валидации.
+        # виджет контента при этом не загружается: он все равно будет заменен на провалидированный
+        entities = await self._resolve(data, article_content=(ArticleContent, article_content_id))
+        # todo: заменить на метод кверисета get_one_or_raise или типа того
+        article_content = self.get_or_404(entities["article_content"])
+        validated_data = self._validate(data, entities)  # наверно вместо put иметь только patch
         article_content.update(**validated_data)
         return article_content
 
-    async def _get_article_content(self, article_content_id: int) -> ArticleContent:
-        article_content = await self._article_content_repository.objects.filter(id=article_content_id).options('widget').first()
-        # todo: заменить на метод кверисета get_one_or_raise или типа того
-        return self.get_or_404(article_content)
+
+class MenuTreeService:
+    # сериализованное дерево меню хранится в кэше до изменения любого пункта (см. invalidate_on_commit)
+    cache_key = "tree"
+
+    def __init__(self, menu_repository: MenuRepository = Depends()):
+        self._menu_repository = menu_repository
+
+    async def get_tree_json(self) -> bytes:
+        if (tree := await menu_cache.get(self.cache_key)) is not None:
+            return tree.encode()
+        tree = build_tree(await self._menu_repository.get_tree_rows())
+        body = dump_json(list[MenuTreeSchema], tree)
+        await menu_cache.set(self.cache_key, body.decode())
+        return body
@@ -1,4 +1,5 @@
-from candidates_for_external_lib.utils.time import utcnow
+from sqlalchemy import func
+
 from models import Section, Subsection
 from models.help import ReferenceInfoStatus
 
@@ -9,19 +10,13 @@ def is_published_instance(new_status: str, instance: Section | Subsection) -> bo
     return already_published or will_be_published
 
 
-def subsection_has_content(subsection: Subsection) -> bool:
-    articles_content = subsection.article_content
-    if not articles_content:
-        return False
-    return any(content.has_content for content in articles_content)
-
-
 def is_single_subsection(subsection: Subsection) -> bool:
     return len(subsection.section.subsections) == 1
 
 
 def delete_section(section: Section) -> None:
-    deleted_at = utcnow()
+    # время удаления, как и updated_at, подставляется СУБД (см. TimestampzMixin)
+    deleted_at = func.now()
     section.update(deleted_at=deleted_at, status=ReferenceInfoStatus.unpublished)
     for ss in section.subsections:
         ss.update(status=ReferenceInfoStatus.unpublished, deleted_at=deleted_at)
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query, Response
 from fastapi_filter import FilterDepends
 
-from candidates_for_external_lib.responses.paginated import PaginatedResponse
-from candidates_for_external_lib.pagination import PageNumberPagination
-from shared.repositories.help import WidgetsRepository, SectionsRepository, ArticleContentRepository
+from candidates_for_external_lib.responses.json import ModelResponse
+from candidates_for_external_lib.responses.paginated import PaginatedResponse, CursorPaginatedResponse
+from candidates_for_external_lib.responses.streaming import ExportFormat, ExportResponse
+from candidates_for_external_lib.pagination import PageNumberPagination, CursorPagination
+from db import session_factory
+from shared.repositories.help import WidgetsRepository, SectionsRepository, ArticleContentRepository, MenuRepository
+from web.api.help.cache import SectionResponseCache, SectionListResponseCache, ArticleContentResponseCache
 from web.api.help.filters import SectionFilters, ArticleContentFilters
 from web.api.help.schemas import WidgetSchema, RetrieveSectionSchema, CreateUpdateSectionSchema, \
-    RetrieveArticleContentSchema, CreateUpdateArticleContentSchema
+    RetrieveArticleContentSchema, CreateUpdateArticleContentSchema, MenuSchema, MenuTreeSchema
 from web.api.help.services import CreateSectionService, SectionUpdateService, SectionDeleteService, \
-    ArticleContentCreateService, ArticleContentUpdateService
+    ArticleContentCreateService, ArticleContentUpdateService, MenuTreeService
 from web.exceptions import NotFoundError
 
 router = APIRouter(tags=["Справка"])
@@ -16,7 +22,7 @@ router = APIRouter(tags=["Справка"])
 
 @router.get("/widgets", response_model=list[WidgetSchema])
 async def get_widgets(repository: WidgetsRepository = Depends()):
-    return await repository.all()
+    return ModelResponse(await repository.all(), list[WidgetSchema])
 
 
 @router.post("/section", response_model=RetrieveSectionSchema, status_code=201)
@@ -27,11 +33,30 @@ async def create_section(data: CreateUpdateSectionSchema, service: CreateSection
     return await service.create_section(data)
 
 
+@router.get("/section/cursor", response_model=CursorPaginatedResponse[RetrieveSectionSchema])
+async def get_sections_by_cursor(
+    filtering: SectionFilters = FilterDepends(SectionFilters),
+    pagination: CursorPagination = Depends(),
+    repository: SectionsRepository = Depends(),
+    cache: SectionListResponseCache = Depends(),
+):
+    # keyset-пагинация без подсчета общего количества: время ответа не зависит от номера страницы.
+    # объявлен раньше /section/{section_id}, иначе cursor попадет в идентификатор
+    if response := await cache.get_response():
+        return response
+    sections = await repository.get_list_w_subsections(filtering, pagination)
+    return cache.store(sections, CursorPaginatedResponse[RetrieveSectionSchema])
+
+
 @router.get("/section/{section_id}", response_model=RetrieveSectionSchema)
-async def get_section(section_id: int, repository: SectionsRepository = Depends()):
+async def get_section(
+    section_id: int, repository: SectionsRepository = Depends(), cache: SectionResponseCache = Depends()
+):
+    if response := await cache.get_response():
+        return response
     if section := await repository.get_section_for_retrieve(section_id):
         # todo: заменить на метод кверисета get_one_or_raise или типа того
-        return section
+        return cache.store(section, RetrieveSectionSchema)
     raise NotFoundError
 
 
@@ -50,8 +75,12 @@ async def get_sections(
     filtering: SectionFilters = FilterDepends(SectionFilters),
     pagination: PageNumberPagination = Depends(),
     repository: SectionsRepository = Depends(),
+    cache: SectionListResponseCache = Depends(),
 ):
-    return await repository.get_list_w_subsections(filtering, pagination)
+    if response := await cache.get_response():
+        return response
+    sections = await repository.get_list_w_subsections(filtering, pagination)
+    return cache.store(sections, PaginatedResponse[RetrieveSectionSchema])
 
 
 @router.get("/article_content", response_model=PaginatedResponse[RetrieveArticleContentSchema])
@@ -60,7 +89,34 @@ async def get_article_contents(
     pagination: PageNumberPagination = Depends(),
     repository: ArticleContentRepository = Depends(),
 ):
-    return await repository.get_list_w_widgets(filtering, pagination)
+    article_contents = await repository.get_list_w_widgets(filtering, pagination)
+    return ModelResponse(article_contents, PaginatedResponse[RetrieveArticleContentSchema])
+
+
+@router.get("/article_content/cursor", response_model=CursorPaginatedResponse[RetrieveArticleContentSchema])
+async def get_article_contents_by_cursor(
+    filtering: ArticleContentFilters = FilterDepends(ArticleContentFilters),
+    pagination: CursorPagination = Depends(),
+    repository: ArticleContentRepository = Depends(),
+):
+    article_contents = await repository.get_list_w_widgets(filtering, pagination)
+    return ModelResponse(article_contents, CursorPaginatedResponse[RetrieveArticleContentSchema])
+
+
+@router.get("/article_content/export", response_class=ExportResponse)
+async def export_article_contents(
+    export_format: Annotated[ExportFormat, Query(alias="format")] = ExportFormat.ndjson,
+    filtering: ArticleContentFilters = FilterDepends(ArticleContentFilters),
+):
+    # объявлен раньше /article_content/{article_content_id}, иначе export попадет в идентификатор.
+    # зависимости с yield (get_session) закрываются до отправки потокового ответа,
+    # поэтому сессия открывается на время выгрузки в самом генераторе
+    async def entries():
+        async with session_factory() as session:
+            async for entry in ArticleContentRepository(session).get_export_queryset(filtering).stream():
+                yield entry
+
+    return ExportResponse(entries(), RetrieveArticleContentSchema, export_format, "article_content")
 
 
 @router.post("/article_content", response_model=RetrieveArticleContentSchema, status_code=201)
@@ -71,10 +127,16 @@ async def create_article_content(
 
 
 @router.get("/article_content/{article_content_id}", response_model=RetrieveArticleContentSchema)
-async def get_article_content(article_content_id: int, repository: ArticleContentRepository = Depends()):
+async def get_article_content(
+    article_content_id: int,
+    repository: ArticleContentRepository = Depends(),
+    cache: ArticleContentResponseCache = Depends(),
+):
+    if response := await cache.get_response():
+        return response
     if ac := await repository.objects.filter(id=article_content_id).options('widget').first():
         # todo: заменить на метод кверисета get_one_or_raise или типа того
-        return ac
+        return cache.store(ac, RetrieveArticleContentSchema)
     raise NotFoundError
 
 
@@ -88,3 +150,18 @@ async def update_article_content(
 @router.delete("/article_content/{article_content_id}", status_code=204)
 async def delete_article_content(article_content_id: int, repository: ArticleContentRepository = Depends()):
     await repository.delete_by_id(article_content_id)
+
+
+@router.get("/menu", response_model=list[MenuTreeSchema])
+async def get_menu(service: MenuTreeService = Depends()):
+    return Response(await service.get_tree_json(), media_type="application/json")
+
+
+@router.get("/menu/export", response_class=ExportResponse)
+async def export_menu(export_format: Annotated[ExportFormat, Query(alias="format")] = ExportFormat.ndjson):
+    async def entries():
+        async with session_factory() as session:
+            async for entry in MenuRepository(session).get_export_queryset().stream():
+                yield entry
+
+    return ExportResponse(entries(), MenuSchema, export_format, "menu")
@@ -1,20 +1,32 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 import sentry_sdk
-from benedict import benedict
 from fastapi import FastAPI, APIRouter
 from fastapi.exceptions import RequestValidationError
-from prometheus_fastapi_instrumentator import PrometheusFastApiInstrumentator
+from prometheus_fastapi_instrumentator import PrometheusFastApiInstrumentator, metrics
 from sentry_sdk.integrations.fastapi import FastApiIntegration
 from sentry_sdk.integrations.logging import LoggingIntegration
 from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
 from sentry_sdk.integrations.starlette import StarletteIntegration
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from starlette.staticfiles import StaticFiles
 
+from candidates_for_external_lib.logs import QueueLogging
+from candidates_for_external_lib.middlewares import (
+    AccessLogMiddleware,
+    QueryStatsMiddleware,
+    RequestIdMiddleware,
+    TimingMiddleware,
+)
+from candidates_for_external_lib.sqlalchemy.pool import observe_pool
+from candidates_for_external_lib.sqlalchemy.stats import query_stats_metrics
+from candidates_for_external_lib.utils.dicts import set_by_path
 from config import settings
+from db import engine, replicas
 from shared.constants import EnvironmentEnum
 
 from web.api.docs.views import router as docs_router
@@ -22,34 +34,30 @@ from web.api.monitoring.views import router as monitoring_router
 from web.api.help.views import router as help_router
 from web.exceptions import RequestBodyValidationError, NotFoundError, AnyBodyBadRequestError
 from web.i18n import locale
-from web.middlewares import example_middleware
 
 APP_ROOT = Path(__file__).parent
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
 
 # todo: обработчики можно вынести в библиотеку в папку faststream, например
 
 def request_body_validation_error_handler(request: Request, exc: RequestBodyValidationError):
-    return JSONResponse(exc.validation_errors, status_code=422)
+    return ORJSONResponse(exc.validation_errors, status_code=422)
 
 
 def not_found_error_handler(request: Request, exc: NotFoundError):
-    return JSONResponse({"error": exc.error}, status_code=404)
+    return ORJSONResponse({"error": exc.error}, status_code=404)
 
 
-def any_body_bad_request_exception_handler(request: Request, exc: AnyBodyBadRequestError) -> JSONResponse:
-    return JSONResponse(status_code=400, content=exc.body)
+def any_body_bad_request_exception_handler(request: Request, exc: AnyBodyBadRequestError) -> ORJSONResponse:
+    return ORJSONResponse(status_code=400, content=exc.body)
 
 
 def request_validation_error_handler(request: Request, exc):
-    errors = locale.translate(exc.errors(), "ru_RU")
-    content = benedict()
+    errors = locale.translate(exc.errors(), locale.negotiate(request.headers.get("accept-language")))
+    content = {}
     for error in errors:
-        key = []
-        for item in error["loc"][1:]:
-            key.append(item)
-        key = '.'.join(key)
-        content[key] = error["msg"]
-    return JSONResponse(content, status_code=422)
+        set_by_path(content, [str(item) for item in error["loc"][1:]], error["msg"])
+    return ORJSONResponse(content, status_code=422)
 
 
 def include_routers(app: FastAPI):
@@ -63,13 +71,48 @@ def include_routers(app: FastAPI):
 
 
 def add_middlewares(app: FastAPI):
-    app.middleware("http")(example_middleware)
+    # последняя добавленная миддлварь - внешняя: идентификатор запроса уже есть при записи в журнал
+    app.add_middleware(
+        QueryStatsMiddleware,
+        logger=logging.getLogger("web.db"),
+        slow_queries=settings.db.slow_request_queries,
+        slow_duration=settings.db.slow_request_duration,
+    )
+    app.add_middleware(AccessLogMiddleware, logger=logging.getLogger("web.access"))
+    app.add_middleware(TimingMiddleware)
+    app.add_middleware(RequestIdMiddleware)
+
+
+def get_queue_logging() -> QueueLogging:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return QueueLogging(handler, level=settings.log_level)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    queue_logging = get_queue_logging()
+    queue_logging.start()
+    health_checks = None
+    if replicas.engines:
+        health_checks = asyncio.create_task(replicas.run_health_checks(settings.db.replica_check_interval))
+    try:
+        yield
+    finally:
+        if health_checks is not None:
+            health_checks.cancel()
+        queue_logging.stop()
 
 
 def setup_prometheus(app: FastAPI) -> None:  # pragma: no cover
     instrumentator = PrometheusFastApiInstrumentator(should_group_status_codes=False)
+    # при добавлении своих инструментаций метрики по умолчанию подключаются явно
+    instrumentator.add(metrics.default(), query_stats_metrics())
     instrumentator = instrumentator.instrument(app)
     instrumentator.expose(app, should_gzip=True, name="prometheus_metrics", tags=["Метрики"])
+    observe_pool(engine, settings.db.pool_name)
+    for replica_engine in replicas.engines:
+        observe_pool(replica_engine, replica_engine.pool.logging_name)
 
 
 def get_app() -> FastAPI:
@@ -91,6 +134,8 @@ def get_app() -> FastAPI:
         openapi_url=(f"/{settings.api.root}/docs/openapi.json" if settings.api.docs_enabled else None),
         redoc_url=None,
         version=settings.api.version,
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan,
         exception_handlers={
             RequestValidationError: request_validation_error_handler,
             RequestBodyValidationError: request_body_validation_error_handler,
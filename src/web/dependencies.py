@@ -1,17 +1,26 @@
 from typing import AsyncGenerator
 
+from fastapi import Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from candidates_for_external_lib.sqlalchemy.routing import READ_ONLY_KEY, USE_PRIMARY_KEY
 from db import session_factory
 
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    session = session_factory()
+
+async def get_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    # соединение берется из пула только при первом запросе к БД: ответ из кэша или 304 пул не занимает.
+    # безопасные методы только читают: запросы идут вне транзакции и фиксировать нечего.
+    # изменяющие запросы читают из основной БД: проверки перед записью не должны видеть отставание реплик
+    read_only = request.method in SAFE_METHODS
+    session = session_factory(info={USE_PRIMARY_KEY: not read_only, READ_ONLY_KEY: read_only})
     try:
         yield session  # NOSONAR
-        await session.commit()
+        if not read_only:
+            await session.commit()
     except Exception:
         await session.rollback()
         raise
     finally:
-        await session.close()
\ No newline at end of file
+        await session.close()
@@ -1,4 +1,4 @@
-from pydantic_i18n import PydanticI18n
+from candidates_for_external_lib.i18n import Translator
 
 FIELD_REQUIRED = "Обязательное поле"
 
@@ -13,4 +13,4 @@ translations = {
     }
 }
 
-locale = PydanticI18n(translations, "ru_RU")
+locale = Translator(translations, "ru_RU")